@@ -1,169 +1,443 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case
+from sqlalchemy import func
+from datetime import date, datetime, time, timedelta
+from statistics import median
+from typing import Optional
 
-from .deps import get_db, get_current_user
+from .deps import get_read_db, get_current_user, db_route
+from .conditional import conditional_get, time_bucket, user_data_version
+from .analytics_cache import analytics_cache
 from .models import Task, User
+from .stats import read_counters, read_daily, as_date
 
 router = APIRouter(
     prefix="/analytics",
     tags=["Analytics"],
 )
 
+# Besides task writes, these responses change with the clock: overdue
+# counts and the cycle-time window move continuously, trend buckets at
+# (local) day boundaries, which fall on quarter hours. Their ETags and
+# cached results are therefore also bound to a time bucket of this many
+# seconds.
+SUMMARY_ETAG_BUCKET = 60
+TREND_ETAG_BUCKET = 900
+
+
+def cached_summary(db: Session, user_id: int) -> dict:
+    """task_summary() through the analytics result cache."""
+    return analytics_cache.get_or_compute(
+        user_id,
+        user_data_version(db, user_id),
+        "summary",
+        {"bucket": time_bucket(SUMMARY_ETAG_BUCKET)},
+        lambda: task_summary(db, user_id),
+    )
+
 # =========================================================
-# OVERVIEW STATISTICS (Status + Priority)
+# SUMMARY (materialized counters)
 # =========================================================
-@router.get("/overview", status_code=status.HTTP_200_OK)
-def overview(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-):
-    status_data = (
-        db.query(Task.status, func.count(Task.id))
+def task_summary(db: Session, user_id: int) -> dict:
+    """
+    Builds every dashboard counter from the materialized task_stats
+    buckets (one row per status x priority). Only the overdue count,
+    which depends on today's date, is counted from the tasks table,
+    through the (created_by, due_date) index.
+    """
+    rows = read_counters(db, user_id)
+
+    overdue_tasks = (
+        db.query(func.count(Task.id))
         .filter(
-            Task.created_by == current_user.id,
+            Task.created_by == user_id,
             Task.is_deleted == False,
+            Task.due_date < func.current_date(),
+            Task.status != "done",
         )
-        .group_by(Task.status)
-        .all()
+        .scalar()
     )
 
-    priority_data = (
-        db.query(Task.priority, func.count(Task.id))
-        .filter(
-            Task.created_by == current_user.id,
-            Task.is_deleted == False,
-        )
-        .group_by(Task.priority)
-        .all()
+    by_status = {}
+    by_priority = {}
+
+    for task_status, priority, count in rows:
+        by_status[task_status] = by_status.get(task_status, 0) + count
+        by_priority[priority] = by_priority.get(priority, 0) + count
+
+    total_tasks = sum(by_status.values())
+    completed_tasks = by_status.get("done", 0)
+
+    completion_rate = (
+        round((completed_tasks / total_tasks) * 100, 2)
+        if total_tasks > 0
+        else 0
     )
 
     return {
         "by_status": [
-            {"status": status, "count": count}
-            for status, count in status_data
+            {"status": key, "count": by_status[key]}
+            for key in sorted(by_status)
         ],
         "by_priority": [
-            {"priority": priority, "count": count}
-            for priority, count in priority_data
+            {"priority": key, "count": by_priority[key]}
+            for key in sorted(by_priority)
         ],
+        "total_tasks": total_tasks,
+        "completed_tasks": completed_tasks,
+        "completion_rate": completion_rate,
+        "overdue_tasks": overdue_tasks,
+    }
+
+
+@router.get(
+    "/summary",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(conditional_get(SUMMARY_ETAG_BUCKET, read=True))],
+)
+@db_route
+def summary(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    return cached_summary(db, current_user.id)
+
+
+# =========================================================
+# OVERVIEW STATISTICS (Status + Priority)
+# =========================================================
+@router.get(
+    "/overview",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(conditional_get(SUMMARY_ETAG_BUCKET, read=True))],
+)
+@db_route
+def overview(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    data = cached_summary(db, current_user.id)
+
+    return {
+        "by_status": data["by_status"],
+        "by_priority": data["by_priority"],
     }
 
 
 # =========================================================
 # USER PERFORMANCE METRICS
 # =========================================================
-@router.get("/user-performance", status_code=status.HTTP_200_OK)
+@router.get(
+    "/user-performance",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(conditional_get(SUMMARY_ETAG_BUCKET, read=True))],
+)
+@db_route
 def user_performance(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    total_tasks = (
-        db.query(func.count(Task.id))
-        .filter(
-            Task.created_by == current_user.id,
-            Task.is_deleted == False,
+    data = cached_summary(db, current_user.id)
+
+    return {
+        "total_tasks": data["total_tasks"],
+        "completed_tasks": data["completed_tasks"],
+        "completion_rate": data["completion_rate"],
+        "overdue_tasks": data["overdue_tasks"],
+    }
+
+
+# =========================================================
+# TREND SERIES (range + granularity + timezone)
+# =========================================================
+# Trend endpoints return a fixed-size, gap-filled series for [from, to]
+# (inclusive, in the client's local dates) bucketed by day, week
+# (starting Monday) or month. Without bounds the most recent
+# DEFAULT_TREND_BUCKETS buckets are returned.
+
+DEFAULT_TREND_BUCKETS = {"day": 30, "week": 26, "month": 12}
+MAX_TREND_BUCKETS = 400
+
+
+def trend_range(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    granularity: str = Query("day", pattern="^(day|week|month)$"),
+    tz_offset: int = Query(
+        0,
+        ge=-14 * 60,
+        le=14 * 60,
+        description="Client offset from UTC in minutes (UTC+02:00 is 120)",
+    ),
+):
+    if to_date is None:
+        to_date = (datetime.utcnow() + timedelta(minutes=tz_offset)).date()
+    if from_date is None:
+        try:
+            from_date = _shift_buckets(
+                _bucket_start(to_date, granularity),
+                granularity,
+                1 - DEFAULT_TREND_BUCKETS[granularity],
+            )
+        except (OverflowError, ValueError):
+            raise HTTPException(status_code=400, detail="Range outside supported dates")
+
+    if from_date > to_date:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+    # Counted before any bucket is built: a range of centuries would
+    # otherwise materialize millions of dates just to be rejected
+    count = _bucket_count(from_date, to_date, granularity)
+    if count > MAX_TREND_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range too large (max {MAX_TREND_BUCKETS} buckets)",
         )
-        .scalar()
+    buckets = _bucket_starts(from_date, granularity, count)
+
+    return {
+        "from": from_date,
+        "to": to_date,
+        "granularity": granularity,
+        "tz_offset": tz_offset,
+        "buckets": buckets,
+    }
+
+
+def _bucket_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _shift_buckets(start: date, granularity: str, count: int) -> date:
+    if granularity == "day":
+        return start + timedelta(days=count)
+    if granularity == "week":
+        return start + timedelta(weeks=count)
+    months = start.year * 12 + start.month - 1 + count
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def _bucket_index(day: date, granularity: str) -> int:
+    """Position of day's bucket on a running day / week / month scale."""
+    if granularity == "week":
+        return _bucket_start(day, granularity).toordinal() // 7
+    if granularity == "month":
+        return day.year * 12 + day.month - 1
+    return day.toordinal()
+
+
+def _bucket_count(from_date: date, to_date: date, granularity: str) -> int:
+    return _bucket_index(to_date, granularity) - _bucket_index(from_date, granularity) + 1
+
+
+def _bucket_starts(from_date: date, granularity: str, count: int) -> list:
+    # Shifting from the first bucket, never past the last one: the bucket
+    # after a range ending in 9999-12 does not exist
+    start = _bucket_start(from_date, granularity)
+    return [_shift_buckets(start, granularity, i) for i in range(count)]
+
+
+def _utc_start(day: date, offset: timedelta) -> datetime:
+    """Start of the local day in UTC, clamped to the datetime range."""
+    try:
+        return datetime.combine(day, time.min) - offset
+    except OverflowError:
+        return datetime.min if offset > timedelta(0) else datetime.max
+
+
+def _local_day(db: Session, column, tz_offset: int):
+    if db.get_bind().dialect.name == "sqlite":
+        return func.date(column, f"{tz_offset:+d} minutes")
+    return func.date(column + timedelta(minutes=tz_offset))
+
+
+def _daily_counts(db: Session, user_id: int, rng: dict) -> dict:
+    """
+    {local day: [created, completed]} for days inside the range.
+
+    In UTC the materialized task_daily_stats buckets are read directly.
+    Other offsets shift day boundaries, so the tasks table is aggregated
+    over the equivalent UTC window using the (created_by, created_at)
+    and (created_by, completed_at) indexes.
+    """
+    counts = {}
+
+    if rng["tz_offset"] == 0:
+        for day, created, completed in read_daily(db, user_id, rng["from"], rng["to"]):
+            counts[day] = [created, completed]
+        return counts
+
+    offset = timedelta(minutes=rng["tz_offset"])
+    start = _utc_start(rng["from"], offset)
+    end = (
+        _utc_start(rng["to"] + timedelta(days=1), offset)
+        if rng["to"] < date.max
+        else datetime.max
     )
 
-    completed_tasks = (
-        db.query(func.count(Task.id))
+    created_day = _local_day(db, Task.created_at, rng["tz_offset"])
+    created_rows = (
+        db.query(created_day, func.count(Task.id))
         .filter(
-            Task.created_by == current_user.id,
-            Task.status == "done",
+            Task.created_by == user_id,
             Task.is_deleted == False,
+            Task.created_at >= start,
+            Task.created_at < end,
         )
-        .scalar()
+        .group_by(created_day)
+        .all()
     )
+    for day, count in created_rows:
+        counts.setdefault(as_date(day), [0, 0])[0] = count
 
-    overdue_tasks = (
-        db.query(func.count(Task.id))
+    completed_day = _local_day(db, Task.completed_at, rng["tz_offset"])
+    completed_rows = (
+        db.query(completed_day, func.count(Task.id))
         .filter(
-            Task.created_by == current_user.id,
+            Task.created_by == user_id,
             Task.is_deleted == False,
-            Task.due_date != None,
-            Task.due_date < func.current_date(),
-            Task.status != "done",
+            Task.status == "done",
+            Task.completed_at >= start,
+            Task.completed_at < end,
         )
-        .scalar()
+        .group_by(completed_day)
+        .all()
     )
+    for day, count in completed_rows:
+        counts.setdefault(as_date(day), [0, 0])[1] = count
 
-    completion_rate = (
-        round((completed_tasks / total_tasks) * 100, 2)
-        if total_tasks > 0
-        else 0
-    )
+    return counts
+
+
+def _series(db: Session, user_id: int, rng: dict) -> list:
+    """Gap-filled [(bucket start, created, completed)] for the range."""
+    totals = {bucket: [0, 0] for bucket in rng["buckets"]}
+
+    for day, (created, completed) in _daily_counts(db, user_id, rng).items():
+        bucket = totals.get(_bucket_start(day, rng["granularity"]))
+        if bucket is not None:
+            bucket[0] += created
+            bucket[1] += completed
 
+    return [
+        (bucket, created, completed)
+        for bucket, (created, completed) in totals.items()
+    ]
+
+
+def _range_params(rng: dict) -> dict:
+    """Cache key parameters of a resolved trend range."""
     return {
-        "total_tasks": total_tasks,
-        "completed_tasks": completed_tasks,
-        "completion_rate": completion_rate,
-        "overdue_tasks": overdue_tasks,
+        "from": rng["from"],
+        "to": rng["to"],
+        "granularity": rng["granularity"],
+        "tz_offset": rng["tz_offset"],
     }
 
 
 # =========================================================
 # TASK TRENDS OVER TIME (CREATED)
 # =========================================================
-@router.get("/trends", status_code=status.HTTP_200_OK)
+@router.get(
+    "/trends",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(conditional_get(TREND_ETAG_BUCKET, read=True))],
+)
+@db_route
 def task_trends(
+    rng: dict = Depends(trend_range),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    data = (
-        db.query(
-            func.date(Task.created_at).label("date"),
-            func.count(Task.id).label("count"),
-        )
-        .filter(
-            Task.created_by == current_user.id,
-            Task.is_deleted == False,
-        )
-        .group_by(func.date(Task.created_at))
-        .order_by(func.date(Task.created_at))
-        .all()
+    return analytics_cache.get_or_compute(
+        current_user.id,
+        user_data_version(db, current_user.id),
+        "trends",
+        _range_params(rng),
+        lambda: [
+            {"date": str(bucket), "count": created}
+            for bucket, created, _ in _series(db, current_user.id, rng)
+        ],
     )
 
-    return [
-        {"date": str(date), "count": count}
-        for date, count in data
-    ]
-
 
 # =========================================================
 # COMPLETION TRENDS (CREATED vs COMPLETED)
 # =========================================================
-@router.get("/completion-trends", status_code=status.HTTP_200_OK)
+# "created" counts tasks by creation day, "completed" by the day
+# they were completed (completed_at), not the day they were created.
+@router.get(
+    "/completion-trends",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(conditional_get(TREND_ETAG_BUCKET, read=True))],
+)
+@db_route
 def completion_trends(
+    rng: dict = Depends(trend_range),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    data = (
-        db.query(
-            func.date(Task.created_at).label("date"),
-            func.count(Task.id).label("created"),
-            func.sum(
-                case(
-                    (Task.status == "done", 1),
-                    else_=0,
-                )
-            ).label("completed"),
-        )
+    return analytics_cache.get_or_compute(
+        current_user.id,
+        user_data_version(db, current_user.id),
+        "completion-trends",
+        _range_params(rng),
+        lambda: [
+            {
+                "date": str(bucket),
+                "created": created,
+                "completed": completed,
+            }
+            for bucket, created, completed in _series(db, current_user.id, rng)
+        ],
+    )
+
+
+# =========================================================
+# CYCLE TIME + THROUGHPUT
+# =========================================================
+@router.get(
+    "/cycle-time",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(conditional_get(SUMMARY_ETAG_BUCKET, read=True))],
+)
+@db_route
+def cycle_time(
+    days: int = Query(30, ge=1, le=365),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Cycle time (created -> completed) and throughput for tasks completed
+    in the last `days` days, read with a (created_by, completed_at)
+    index range scan.
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+
+    rows = (
+        db.query(Task.created_at, Task.completed_at)
         .filter(
             Task.created_by == current_user.id,
             Task.is_deleted == False,
+            Task.completed_at >= since,
         )
-        .group_by(func.date(Task.created_at))
-        .order_by(func.date(Task.created_at))
         .all()
     )
 
-    return [
-        {
-            "date": str(date),
-            "created": created,
-            "completed": completed,
-        }
-        for date, created, completed in data
-    ]
+    hours = sorted(
+        (completed_at - created_at).total_seconds() / 3600
+        for created_at, completed_at in rows
+    )
+    completed = len(hours)
+
+    return {
+        "window_days": days,
+        "completed_tasks": completed,
+        "throughput_per_day": round(completed / days, 2),
+        "avg_cycle_hours": round(sum(hours) / completed, 2) if completed else None,
+        "median_cycle_hours": round(median(hours), 2) if completed else None,
+    }
@@ -0,0 +1,231 @@
+import asyncio
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+
+from .cache import TTLCache
+from .config import (
+    ANALYTICS_CACHE_BACKEND,
+    ANALYTICS_CACHE_URL,
+    ANALYTICS_CACHE_TTL_SECONDS,
+    ANALYTICS_CACHE_MAX_ENTRIES,
+)
+
+# =========================================================
+# ANALYTICS RESULT CACHE
+# =========================================================
+# Analytics responses are cached per user, endpoint and parameters.
+#
+# Invalidation: every cache key embeds the user's data_version, which is
+# bumped in the same transaction as every write (bump_data_version) and
+# read anyway for the response's ETag (conditional_get). A committed write
+# therefore makes all of the user's entries unreachable at once, in every
+# worker, and they simply age out. The version is read from the same
+# database as the analytics themselves, so a lagging replica never gets
+# newer results cached under an older version or vice versa.
+#
+# Stampede protection: concurrent misses for the same key are coalesced;
+# one caller computes the value while the others wait for it. Under
+# ASYNC_DB handlers run on the event loop, where blocking on a lock would
+# stall every request, so there the waiters of this process await the
+# first caller's asyncio Future instead (across workers, misses are then
+# not coalesced).
+#
+# The memory backend is per process: with several workers each one fills
+# its own cache, so use the redis backend to share entries between them.
+
+# Longest time a caller waits for another caller's computation
+SINGLE_FLIGHT_TIMEOUT_SECONDS = 10
+SINGLE_FLIGHT_POLL_SECONDS = 0.05
+
+
+class MemoryBackend:
+    """In-process LRU (TTLCache) with per-key locks."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.entries = TTLCache(max_entries, ttl)
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value, ttl: float) -> None:
+        self.entries.set(key, value, ttl)
+
+    @contextmanager
+    def single_flight(self, key):
+        """Yields True if this caller had to wait for another one."""
+        with self._lock:
+            lock, waiters = self._locks.get(key, (threading.Lock(), 0))
+            self._locks[key] = (lock, waiters + 1)
+
+        waited = not lock.acquire(blocking=False)
+        acquired = not waited or lock.acquire(timeout=SINGLE_FLIGHT_TIMEOUT_SECONDS)
+        try:
+            yield waited
+        finally:
+            if acquired:
+                lock.release()
+            with self._lock:
+                lock, waiters = self._locks[key]
+                if waiters == 1:
+                    del self._locks[key]
+                else:
+                    self._locks[key] = (lock, waiters - 1)
+
+
+class RedisBackend:
+    """
+    Shared backend on a Redis-protocol server. redis-py is imported
+    lazily so it is only needed when this backend is configured.
+    """
+
+    def __init__(self, url: str, prefix: str = "analytics:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl: float) -> None:
+        self.client.set(self.prefix + key, json.dumps(value), px=int(ttl * 1000))
+
+    @contextmanager
+    def single_flight(self, key):
+        """
+        Distributed variant: SET NX lock; other callers poll for the
+        value until the lock holder has stored it (or gives up).
+        """
+        lock_key = f"{self.prefix}lock:{key}"
+        timeout_ms = SINGLE_FLIGHT_TIMEOUT_SECONDS * 1000
+
+        if self.client.set(lock_key, "1", nx=True, px=timeout_ms):
+            try:
+                yield False
+            finally:
+                self.client.delete(lock_key)
+            return
+
+        deadline = time.monotonic() + SINGLE_FLIGHT_TIMEOUT_SECONDS
+        while time.monotonic() < deadline:
+            if self.client.exists(self.prefix + key) or not self.client.exists(lock_key):
+                break
+            time.sleep(SINGLE_FLIGHT_POLL_SECONDS)
+        yield True
+
+
+class AnalyticsCache:
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        # Counters are updated from concurrent request threads
+        self._stats_lock = threading.Lock()
+        # key -> Future of the computation in flight (event loop callers)
+        self._pending = {}
+
+    def get_or_compute(self, user_id: int, version: int, name: str, params: dict, compute):
+        """
+        Returns the cached result of compute() for (user, name, params) at
+        the user's data `version`, computing and storing it on a miss.
+        Results are stored JSON-encoded.
+        """
+        key = self._key(user_id, version, name, params)
+
+        value = self.backend.get(key)
+        if value is not None:
+            self._count("hits")
+            return value
+
+        if _in_event_loop():
+            return self._coalesce_in_loop(key, compute)
+
+        with self.backend.single_flight(key) as waited:
+            if waited:
+                value = self.backend.get(key)
+                if value is not None:
+                    self._count("coalesced")
+                    return value
+            return self._compute(key, compute)
+
+    def _coalesce_in_loop(self, key, compute):
+        """
+        Single flight for callers on the event loop (ASYNC_DB routes, run
+        through AsyncSession.run_sync): the first caller computes while the
+        others await its Future through SQLAlchemy's greenlet bridge, so the
+        loop keeps serving other requests in the meantime.
+        """
+        loop = asyncio.get_running_loop()
+        pending = self._pending.get(key)
+        if pending is not None and pending.get_loop() is loop and in_greenlet():
+            value = await_only(pending)
+            if value is not None:
+                self._count("coalesced")
+                return value
+            # The first caller failed: compute on our own
+            return self._compute(key, compute)
+
+        future = loop.create_future()
+        self._pending[key] = future
+        value = None
+        try:
+            value = self._compute(key, compute)
+            return value
+        finally:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+            future.set_result(value)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            hits, misses, coalesced = self.hits, self.misses, self.coalesced
+        lookups = hits + misses + coalesced
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": hits,
+            "misses": misses,
+            "coalesced": coalesced,
+            "hit_ratio": round((hits + coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+    def _count(self, counter: str) -> None:
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _compute(self, key, compute):
+        self._count("misses")
+        value = jsonable_encoder(compute())
+        self.backend.set(key, value, self.ttl)
+        return value
+
+    def _key(self, user_id: int, version: int, name: str, params: dict) -> str:
+        encoded = json.dumps(jsonable_encoder(params), sort_keys=True, separators=(",", ":"))
+        return f"{user_id}:{version}:{name}:{encoded}"
+
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _make_backend():
+    if ANALYTICS_CACHE_BACKEND == "redis":
+        return RedisBackend(ANALYTICS_CACHE_URL)
+    return MemoryBackend(ANALYTICS_CACHE_MAX_ENTRIES, ANALYTICS_CACHE_TTL_SECONDS)
+
+
+analytics_cache = AnalyticsCache(_make_backend(), ANALYTICS_CACHE_TTL_SECONDS)
+
@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 from jose import jwt
 from datetime import datetime, timedelta
 
-from .deps import get_db, get_current_user
+from .deps import get_db, get_current_user, db_route, run_db
+from .hashing import hash_password, verify_password
 from .models import User
 from .schemas import UserCreate, UserOut
 
@@ -17,8 +17,9 @@ router = APIRouter(prefix="/auth", tags=["Auth"])
 # -----------------------------
 # Security config
 # -----------------------------
-pwd = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
+# Password hashing (bcrypt) runs on its own pool, see hashing.py.
+# The handlers below are async so they don't hold a threadpool worker
+# while waiting for it; their short DB calls go through run_db().
 SECRET_KEY = "secret"          # safe default for assignment
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_HOURS = 24
@@ -39,34 +40,29 @@ def normalize_password(password: str) -> bytes:
 # Register
 # -----------------------------
 @router.post("/register", status_code=status.HTTP_201_CREATED)
-def register(
+@db_route
+async def register(
     user: UserCreate,
     db: Session = Depends(get_db),
 ):
-    existing_user = (
-        db.query(User)
-        .filter(User.email == user.email.strip().lower())
-        .first()
-    )
+    email = user.email.strip().lower()
 
-    if existing_user:
+    if await run_db(db, _get_user_by_email, email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered",
         )
 
     safe_password = normalize_password(user.password)
-    hashed_password = pwd.hash(safe_password)
+    hashed_password = await hash_password(safe_password)
 
     db_user = User(
         name=user.name.strip(),
-        email=user.email.strip().lower(),
+        email=email,
         password=hashed_password,
     )
 
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await run_db(db, _save_user, db_user)
 
     return {"message": "User registered successfully"}
 
@@ -75,14 +71,15 @@ def register(
 # Login
 # -----------------------------
 @router.post("/login")
-def login(
+@db_route
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db),
 ):
     # OAuth2PasswordRequestForm uses "username"
     email = form_data.username.strip().lower()
 
-    user = db.query(User).filter(User.email == email).first()
+    user = await run_db(db, _get_user_by_email, email)
 
     if not user:
         raise HTTPException(
@@ -92,7 +89,7 @@ def login(
 
     safe_password = normalize_password(form_data.password)
 
-    if not pwd.verify(safe_password, user.password):
+    if not await verify_password(safe_password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
@@ -111,6 +108,15 @@ def login(
     }
 
 
+def _get_user_by_email(db: Session, email: str):
+    return db.query(User).filter(User.email == email).first()
+
+
+def _save_user(db: Session, user: User) -> None:
+    db.add(user)
+    db.commit()
+
+
 # -----------------------------
 # Current user
 # -----------------------------
@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 
-from .deps import get_db, get_current_user
+from .deps import get_db, get_current_user, db_route
+from .conditional import bump_data_version, conditional_get
 from .models import Comment, Task, User
 from .schemas import CommentCreate, CommentUpdate, CommentOut
 
@@ -13,6 +14,7 @@ router = APIRouter(prefix="/comments", tags=["Comments"])
 # Add Comment to Task
 # --------------------
 @router.post("/task/{task_id}", response_model=CommentOut)
+@db_route
 def add_comment(
     task_id: int,
     payload: CommentCreate,
@@ -32,6 +34,7 @@ def add_comment(
         user_id=current_user.id,
     )
     db.add(comment)
+    bump_data_version(db, current_user.id)
     db.commit()
     db.refresh(comment)
     return comment
@@ -40,7 +43,12 @@ def add_comment(
 # --------------------
 # Get Comments for Task
 # --------------------
-@router.get("/task/{task_id}", response_model=List[CommentOut])
+@router.get(
+    "/task/{task_id}",
+    response_model=List[CommentOut],
+    dependencies=[Depends(conditional_get())],
+)
+@db_route
 def get_comments(
     task_id: int,
     current_user: User = Depends(get_current_user),
@@ -65,6 +73,7 @@ def get_comments(
 # Update Comment
 # --------------------
 @router.put("/{comment_id}", response_model=CommentOut)
+@db_route
 def update_comment(
     comment_id: int,
     payload: CommentUpdate,
@@ -79,6 +88,7 @@ def update_comment(
         raise HTTPException(status_code=403, detail="Not allowed")
 
     comment.content = payload.content
+    bump_data_version(db, current_user.id)
     db.commit()
     db.refresh(comment)
     return comment
@@ -88,6 +98,7 @@ def update_comment(
 # Delete Comment
 # --------------------
 @router.delete("/{comment_id}")
+@db_route
 def delete_comment(
     comment_id: int,
     current_user: User = Depends(get_current_user),
@@ -101,5 +112,6 @@ def delete_comment(
         raise HTTPException(status_code=403, detail="Not allowed")
 
     db.delete(comment)
+    bump_data_version(db, current_user.id)
     db.commit()
     return {"message": "Comment deleted successfully"}
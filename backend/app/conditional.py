@@ -0,0 +1,137 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .deps import get_db, get_read_db, get_current_user, db_route
+from .models import User
+
+# =========================================================
+# CONDITIONAL GET (ETag / Last-Modified)
+# =========================================================
+# users.data_version is bumped in the same transaction as every write to a
+# user's tasks, comments or files. Read endpoints derive a strong ETag from
+# (user, version, URL), so a client polling unchanged data gets a bodyless
+# 304 after a single primary-key lookup, before the endpoint's own queries.
+#
+# Responses that also depend on the clock (overdue counts, trend windows)
+# pass a time bucket: the ETag then changes at least once per bucket.
+
+CACHE_CONTROL = "private, no-cache"
+
+# Session.info key of the data versions read by conditional_get(), reused
+# as analytics cache keys (see analytics_cache.py)
+DATA_VERSIONS_KEY = "data_versions"
+
+
+def bump_data_version(db: Session, user_id: int) -> None:
+    """Marks the user's data as changed. Call before committing a write."""
+    db.query(User).filter(User.id == user_id).update(
+        {
+            User.data_version: func.coalesce(User.data_version, 0) + 1,
+            User.data_modified_at: datetime.utcnow(),
+        },
+        synchronize_session=False,
+    )
+
+
+def user_data_version(db: Session, user_id: int) -> int:
+    """
+    The user's data_version as already read by conditional_get() for this
+    request, or looked up now.
+    """
+    versions = db.info.setdefault(DATA_VERSIONS_KEY, {})
+    if user_id not in versions:
+        versions[user_id] = db.query(
+            func.coalesce(User.data_version, 0)
+        ).filter(User.id == user_id).scalar()
+    return versions[user_id]
+
+
+def time_bucket(seconds: int) -> int:
+    """Index of the current `seconds`-long period since the epoch."""
+    return int(time.time()) // seconds
+
+
+def conditional_get(bucket_seconds: Optional[int] = None, read: bool = False):
+    """
+    Dependency factory for conditional GET on a per-user endpoint.
+
+    bucket_seconds: seconds after which the response may change without a
+        write (None for responses that only change on writes).
+    read: read the version from the read database, like the endpoint
+        itself, so the ETag never runs ahead of a lagging replica.
+    """
+    session_dependency = get_read_db if read else get_db
+
+    @db_route
+    def dependency(
+        request: Request,
+        response: Response,
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(session_dependency),
+    ):
+        version, modified_at = db.query(
+            func.coalesce(User.data_version, 0), User.data_modified_at
+        ).filter(User.id == current_user.id).one()
+        db.info.setdefault(DATA_VERSIONS_KEY, {})[current_user.id] = version
+
+        bucket = None
+        if bucket_seconds:
+            bucket = time_bucket(bucket_seconds)
+            bucket_start = datetime.utcfromtimestamp(bucket * bucket_seconds)
+            modified_at = max(modified_at, bucket_start) if modified_at else bucket_start
+
+        headers = {
+            "ETag": _etag(current_user.id, version, bucket, request),
+            "Cache-Control": CACHE_CONTROL,
+        }
+        if modified_at:
+            headers["Last-Modified"] = http_date(modified_at)
+
+        if not_modified(request, headers):
+            raise HTTPException(status_code=304, headers=headers)
+
+        response.headers.update(headers)
+
+    return dependency
+
+
+def _etag(user_id: int, version: int, bucket: Optional[int], request: Request) -> str:
+    url = request.url.path + "?" + "&".join(sorted(
+        f"{key}={value}" for key, value in request.query_params.multi_items()
+    ))
+    digest = hashlib.sha1(f"{user_id}:{bucket}:{url}".encode("utf-8")).hexdigest()[:16]
+    return f'"{version}-{digest}"'
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def not_modified(request: Request, headers: dict) -> bool:
+    """Whether the request's validators match the response headers."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since. Without an
+        # ETag (files stored before content hashes) nothing can match.
+        etag = headers.get("ETag")
+        if etag is None:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and "Last-Modified" in headers:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return parsedate_to_datetime(headers["Last-Modified"]) <= since
+
+    return False
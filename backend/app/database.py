@@ -1,20 +1,290 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import threading
+import time
 
-# SQLite database for quick setup and local development
-DATABASE_URL = "sqlite:///./tasks.db"
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool, StaticPool
 
-engine = create_engine(
+from .config import (
     DATABASE_URL,
-    connect_args={"check_same_thread": False}
+    DATABASE_READ_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    ASYNC_DB,
+    SQLITE_PROFILE,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_MMAP_SIZE,
+    SQLITE_SERIALIZE_WRITES,
 )
 
-# Session factory used by FastAPI dependencies
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that records how long checkouts wait for a connection,
+    so pool saturation can be monitored (see pool_stats()).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_count = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.wait_count += 1
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+    def recreate(self):
+        # Keep the instrumentation across pool re-creation (e.g. dispose())
+        return self.__class__(
+            self._creator,
+            pool_size=self._pool.maxsize,
+            max_overflow=self._max_overflow,
+            pre_ping=self._pre_ping,
+            use_lifo=self._pool.use_lifo,
+            timeout=self._timeout,
+            recycle=self._recycle,
+            echo=self.echo,
+            logging_name=self._orig_logging_name,
+            reset_on_return=self._reset_on_return,
+            _dispatch=self.dispatch,
+            dialect=self._dialect,
+        )
+
+
+def make_engine(url: str):
+    """
+    Creates an engine with the configured connection pool. In-memory
+    SQLite keeps a single shared connection instead (StaticPool).
+    """
+    kwargs = {}
+
+    if url.startswith("sqlite"):
+        kwargs["connect_args"] = {"check_same_thread": False}
+
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/") == "sqlite:"):
+        kwargs["poolclass"] = StaticPool
+    else:
+        kwargs.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+
+    new_engine = create_engine(url, **kwargs)
+    configure_sqlite(new_engine)
+    return new_engine
+
+
+def pool_stats(engine) -> dict:
+    pool = engine.pool
+    stats = {
+        "pool": type(pool).__name__,
+        "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+    }
+
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+        )
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update(
+            checkouts=pool.wait_count,
+            wait_time_total_ms=round(pool.wait_time_total * 1000, 3),
+            wait_time_max_ms=round(pool.wait_time_max * 1000, 3),
+            timeouts=pool.timeouts,
+        )
+    return stats
+
+
+# Base class for all ORM models
+Base = declarative_base()
+
+
+# =========================================================
+# SQLITE CONNECTION PROFILE
+# =========================================================
+# WAL lets readers run alongside a writer, NORMAL sync is durable across
+# application crashes in WAL mode, and busy_timeout makes connections wait
+# for locks instead of failing with "database is locked".
+SQLITE_PROFILES = {
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+        "cache_size": -SQLITE_CACHE_SIZE_KB,
+        "mmap_size": SQLITE_MMAP_SIZE,
+        "temp_store": "MEMORY",
+    },
+    "default": {},
+}
+
+
+def configure_sqlite(
+    engine,
+    profile: str = SQLITE_PROFILE,
+    serialize_writes: bool = SQLITE_SERIALIZE_WRITES,
+) -> None:
+    """
+    Applies the pragma profile to every new connection and, if enabled,
+    serializes write transactions within this process.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    pragmas = SQLITE_PROFILES[profile]
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    if serialize_writes:
+        _serialize_writes(engine)
+
+
+# =========================================================
+# IN-PROCESS WRITE SERIALIZATION
+# =========================================================
+# SQLite allows one writer at a time. Rather than letting concurrent
+# request threads collide on the database lock, a transaction takes this
+# process-wide lock right before its first write statement and holds it
+# until it commits or rolls back.
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER")
+
+_write_lock = threading.Lock()
+
+
+def _serialize_writes(engine) -> None:
+    timeout = SQLITE_BUSY_TIMEOUT_MS / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _acquire(conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get("holds_write_lock"):
+            return
+        if statement.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+            # On timeout fall through to SQLite's own busy handling
+            if _write_lock.acquire(timeout=timeout):
+                conn.info["holds_write_lock"] = True
+
+    @event.listens_for(engine, "commit")
+    @event.listens_for(engine, "rollback")
+    def _release(conn):
+        _release_write_lock(conn.info)
+
+    # Safety net: never return a connection to the pool holding the lock
+    @event.listens_for(engine, "checkin")
+    def _release_on_checkin(dbapi_connection, connection_record):
+        _release_write_lock(connection_record.info)
+
+
+def _release_write_lock(info: dict) -> None:
+    if info.pop("holds_write_lock", False):
+        _write_lock.release()
+
+
+# Primary (read/write) engine and an optional read-replica engine
+engine = make_engine(DATABASE_URL)
+read_engine = make_engine(DATABASE_READ_URL) if DATABASE_READ_URL else engine
+
+# Session factories used by FastAPI dependencies
 SessionLocal = sessionmaker(
     bind=engine,
     autocommit=False,
     autoflush=False
 )
+ReadSessionLocal = sessionmaker(
+    bind=read_engine,
+    autocommit=False,
+    autoflush=False
+)
 
-# Base class for all ORM models
-Base = declarative_base()
+
+# =========================================================
+# ASYNC ENGINE (ASYNC_DB=1)
+# =========================================================
+# Same databases through async drivers. The write lock above is not used
+# here: it would block the event loop, and SQLite's busy_timeout already
+# makes concurrent writers wait.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def async_url(url: str) -> str:
+    """sqlite:///... -> sqlite+aiosqlite:///..., postgresql://... -> postgresql+asyncpg://..."""
+    scheme, rest = url.split("://", 1)
+    backend = scheme.split("+", 1)[0]
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend!r}")
+    return f"{ASYNC_DRIVERS[backend]}://{rest}"
+
+
+def make_async_engine(url: str):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    kwargs = {}
+
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/") == "sqlite:"):
+        kwargs["poolclass"] = StaticPool
+    else:
+        kwargs.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+
+    new_engine = create_async_engine(async_url(url), **kwargs)
+    configure_sqlite(new_engine.sync_engine, serialize_writes=False)
+    return new_engine
+
+
+async_engine = async_read_engine = None
+AsyncSessionLocal = AsyncReadSessionLocal = None
+
+if ASYNC_DB:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = make_async_engine(DATABASE_URL)
+    async_read_engine = (
+        make_async_engine(DATABASE_READ_URL) if DATABASE_READ_URL else async_engine
+    )
+
+    # Objects are not expired on commit: response models are built after
+    # the session has finished, outside of its greenlet.
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+    AsyncReadSessionLocal = async_sessionmaker(
+        bind=async_read_engine,
+        autoflush=False,
+        expire_on_commit=False,
+    )
@@ -1,14 +1,37 @@
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
 from jose import jwt, JWTError
+import functools
+import inspect
+import time
 
-from .database import SessionLocal
+from .cache import TTLCache
+from .config import ASYNC_DB
+from .database import (
+    SessionLocal,
+    ReadSessionLocal,
+    AsyncSessionLocal,
+    AsyncReadSessionLocal,
+)
 from .models import User
 
 SECRET_KEY = "secret"
 ALGORITHM = "HS256"
 
+# Per-process caches for authentication:
+# - token_cache: raw JWT -> user id (never outlives the token's exp)
+# - user_cache: user id -> column snapshot of the user row
+AUTH_CACHE_TTL_SECONDS = 60
+AUTH_CACHE_MAX_ENTRIES = 10_000
+
+token_cache = TTLCache(AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL_SECONDS)
+user_cache = TTLCache(AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL_SECONDS)
+
+USER_CACHE_FIELDS = ("id", "name", "email")
+
 # OAuth2 scheme for extracting Bearer token from Authorization header
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -26,15 +49,117 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    """
+    Session for read-only routes, bound to the read replica when
+    DATABASE_READ_URL is set (otherwise to the primary database).
+    Replica reads may lag slightly behind the latest writes.
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    """AsyncSession counterpart of get_db (ASYNC_DB=1)."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    """AsyncSession counterpart of get_read_db (ASYNC_DB=1)."""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
+ASYNC_DEPENDENCIES = {
+    get_db: get_async_db,
+    get_read_db: get_async_read_db,
+}
+
+
+def db_route(func):
+    """
+    Serves a route (or dependency) written against a sync Session from
+    an AsyncSession when ASYNC_DB is enabled; a no-op otherwise.
+
+    The `db` parameter is switched to the matching async dependency and a
+    sync handler becomes a coroutine that runs its body with
+    AsyncSession.run_sync(): queries go through the async driver on the
+    event loop, so an in-flight request no longer holds a threadpool
+    thread. Async handlers receive the AsyncSession as is and should use
+    run_db() for their queries.
+    """
+    if not ASYNC_DB:
+        return func
+
+    signature = inspect.signature(func)
+    db_param = signature.parameters["db"]
+    async_dependency = Depends(ASYNC_DEPENDENCIES[db_param.default.dependency])
+    signature = signature.replace(parameters=[
+        param.replace(default=async_dependency) if param.name == "db" else param
+        for param in signature.parameters.values()
+    ])
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await func(*args, **kwargs)
+    else:
+        @functools.wraps(func)
+        async def wrapper(*args, db, **kwargs):
+            return await db.run_sync(lambda session: func(*args, db=session, **kwargs))
+
+    wrapper.__signature__ = signature
+    return wrapper
+
+
+async def run_db(db, fn, *args):
+    """
+    Calls fn(session, *args) from an async handler without blocking the
+    event loop: through run_sync() on an AsyncSession, or in the
+    threadpool on a sync Session.
+    """
+    if isinstance(db, Session):
+        return await run_in_threadpool(fn, db, *args)
+    return await db.run_sync(fn, *args)
+
+
 # Authentication dependency
+@db_route
 def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ):
     """
     Validates JWT token and returns the authenticated user.
-    Used to protect routes.
+    Used to protect routes. Decoded tokens and user rows are cached
+    per process, so a warm request does not query the users table.
     """
+    user_id = token_cache.get(token)
+    if user_id is None:
+        user_id = _decode_token(token)
+
+    snapshot = user_cache.get(user_id)
+    if snapshot is None:
+        user = db.get(User, user_id)
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found"
+            )
+        user_cache.set(user_id, {field: getattr(user, field) for field in USER_CACHE_FIELDS})
+        return user
+
+    # Attach the cached row to this session without a SELECT
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+
+def _decode_token(token: str) -> int:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: int | None = payload.get("user_id")
@@ -49,11 +174,13 @@ def get_current_user(
             detail="Could not validate credentials"
         )
 
-    user = db.query(User).get(user_id)
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found"
-        )
+    expires_in = payload.get("exp", 0) - time.time()
+    token_cache.set(token, user_id, min(AUTH_CACHE_TTL_SECONDS, expires_in))
+    return user_id
+
 
-    return user
+# Drop cached user rows as soon as the row changes
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    user_cache.pop(target.id)
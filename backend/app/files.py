@@ -1,20 +1,34 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
-from uuid import uuid4
-from typing import List
+from anyio import from_thread, to_thread
+from typing import List, Optional
+from collections import Counter
+from datetime import datetime
+from urllib.parse import quote
+import mimetypes
 import os
-import shutil
 from pydantic import BaseModel
 
-from .deps import get_db, get_current_user
+from .config import FILE_ACCEL_PREFIX, FILE_SERVE_MODE
+from .deps import get_db, get_current_user, db_route
+from .conditional import CACHE_CONTROL, bump_data_version, conditional_get, http_date, not_modified
 from .models import File as FileModel, Task, User
-from .utils import validate_file
+from .storage import (
+    UPLOAD_DIR,
+    StoredFile,
+    acquire_blob,
+    check_content_length,
+    receive_upload,
+    receive_uploads,
+    release_blob,
+    sniff_file,
+)
+from .thumbnails import THUMBNAIL_MEDIA_TYPE, ensure_thumbnail, schedule_thumbnail
+from .utils import MAX_BATCH_FILES
 
 router = APIRouter(prefix="/files", tags=["Files"])
 
-UPLOAD_DIR = "uploads"
-
 
 # --------------------
 # Schemas
@@ -23,29 +37,90 @@ class FileOut(BaseModel):
     id: int
     filename: str
     task_id: int
+    size: Optional[int] = None
+    content_type: Optional[str] = None
+    sha256: Optional[str] = None
 
     class Config:
         from_attributes = True
 
 
+class BatchUploadResult(BaseModel):
+    filename: str
+    file: Optional[FileOut] = None
+    error: Optional[str] = None
+
+
+class BatchUploadOut(BaseModel):
+    uploaded: int
+    failed: int
+    results: List[BatchUploadResult]
+
+
 # --------------------
 # Upload file to task
 # --------------------
-@router.post("/task/{task_id}", response_model=FileOut)
-def upload_file(
+UPLOAD_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        "multipart/form-data": {
+            "schema": {
+                "type": "object",
+                "required": ["upload"],
+                "properties": {"upload": {"type": "string", "format": "binary"}},
+            }
+        }
+    },
+}
+
+
+@router.post(
+    "/task/{task_id}",
+    response_model=FileOut,
+    openapi_extra={"requestBody": UPLOAD_REQUEST_BODY},
+)
+async def upload_file(
     task_id: int,
-    upload: UploadFile = File(...),
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    validate_file(upload)
+    """
+    Streams the `upload` form field to disk as it arrives (see storage.py)
+    instead of letting the form parser buffer the whole file first.
+    """
+    check_content_length(request.headers.get("content-length"))
+
+    return await to_thread.run_sync(
+        _store_upload,
+        db,
+        task_id,
+        current_user.id,
+        request.headers.get("content-type", ""),
+        _body_reader(request),
+    )
+
+
+def _body_reader(request: Request):
+    """next_chunk() over the request body, for use from a worker thread."""
+    body = request.stream()
+
+    async def next_chunk():
+        try:
+            return await body.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    return lambda: from_thread.run(next_chunk)
 
+
+def _check_task_owner(db: Session, task_id: int, user_id: int) -> None:
     task = (
-        db.query(Task)
+        db.query(Task.id)
         .filter(
             Task.id == task_id,
             Task.is_deleted == False,
-            Task.created_by == current_user.id,
+            Task.created_by == user_id,
         )
         .first()
     )
@@ -53,34 +128,146 @@ def upload_file(
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-    stored_filename = f"{uuid4()}_{upload.filename}"
-    file_path = os.path.join(UPLOAD_DIR, stored_filename)
+def _store_upload(db: Session, task_id: int, user_id: int, content_type: str, next_chunk) -> FileModel:
+    _check_task_owner(db, task_id, user_id)
 
-    try:
-        with open(file_path, "wb") as f:
-            shutil.copyfileobj(upload.file, f)
-    except Exception:
-        raise HTTPException(status_code=500, detail="Failed to save file")
+    stored = receive_upload(next_chunk, content_type, "upload")
 
+    # An unreferenced blob left behind by a failed commit is removed by gc
     file_db = FileModel(
-        filename=upload.filename,
-        path=file_path,
+        filename=stored.filename,
+        path=stored.path,
         task_id=task_id,
+        size=stored.size,
+        content_type=stored.content_type,
+        sha256=stored.sha256,
+        blob_id=acquire_blob(db, stored),
     )
-
     db.add(file_db)
+    bump_data_version(db, user_id)
     db.commit()
-    db.refresh(file_db)
 
+    schedule_thumbnail(stored.path, stored.content_type)
+
+    db.refresh(file_db)
     return file_db
 
 
+# --------------------
+# Batch upload files to task
+# --------------------
+BATCH_UPLOAD_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        "multipart/form-data": {
+            "schema": {
+                "type": "object",
+                "required": ["uploads"],
+                "properties": {
+                    "uploads": {
+                        "type": "array",
+                        "items": {"type": "string", "format": "binary"},
+                    }
+                },
+            }
+        }
+    },
+}
+
+
+@router.post(
+    "/task/{task_id}/batch",
+    response_model=BatchUploadOut,
+    openapi_extra={"requestBody": BATCH_UPLOAD_REQUEST_BODY},
+)
+async def batch_upload_files(
+    task_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Uploads up to MAX_BATCH_FILES files (repeated `uploads` form field) in
+    one request: one ownership check, every file streamed to storage as it
+    arrives, and all File rows inserted in a single transaction. Rejected
+    files (type, size) are reported per file without failing the others.
+    """
+    check_content_length(request.headers.get("content-length"), MAX_BATCH_FILES)
+
+    return await to_thread.run_sync(
+        _store_uploads,
+        db,
+        task_id,
+        current_user.id,
+        request.headers.get("content-type", ""),
+        _body_reader(request),
+    )
+
+
+def _store_uploads(db: Session, task_id: int, user_id: int, content_type: str, next_chunk) -> dict:
+    _check_task_owner(db, task_id, user_id)
+
+    results = receive_uploads(next_chunk, content_type, "uploads", MAX_BATCH_FILES)
+    if not results:
+        raise HTTPException(status_code=400, detail="Missing file field 'uploads'")
+
+    stored = [result for result in results if isinstance(result, StoredFile)]
+
+    # One blob reference update per distinct content
+    references = Counter(result.sha256 for result in stored)
+    distinct = {result.sha256: result for result in stored}
+    blob_ids = {
+        sha256: acquire_blob(db, result, references[sha256])
+        for sha256, result in distinct.items()
+    }
+
+    files = {
+        id(result): FileModel(
+            filename=result.filename,
+            path=result.path,
+            task_id=task_id,
+            size=result.size,
+            content_type=result.content_type,
+            sha256=result.sha256,
+            blob_id=blob_ids[result.sha256],
+        )
+        for result in stored
+    }
+
+    output = {}
+    if files:
+        db.add_all(files.values())
+        db.flush()
+        # Serialize before commit expires the rows
+        output = {key: FileOut.model_validate(file) for key, file in files.items()}
+        bump_data_version(db, user_id)
+        db.commit()
+
+        for result in distinct.values():
+            schedule_thumbnail(result.path, result.content_type)
+
+    return {
+        "uploaded": len(stored),
+        "failed": len(results) - len(stored),
+        "results": [
+            {"filename": result.filename, "file": output[id(result)]}
+            if isinstance(result, StoredFile)
+            else {"filename": result.filename, "error": result.detail}
+            for result in results
+        ],
+    }
+
+
 # --------------------
 # List files for task
 # --------------------
-@router.get("/task/{task_id}", response_model=List[FileOut])
+@router.get(
+    "/task/{task_id}",
+    response_model=List[FileOut],
+    dependencies=[Depends(conditional_get())],
+)
+@db_route
 def get_files_for_task(
     task_id: int,
     current_user: User = Depends(get_current_user),
@@ -112,71 +299,146 @@ def get_files_for_task(
 # --------------------
 # Download file
 # --------------------
-@router.get("/{file_id}")
+def _owned_file(db: Session, file_id: int, user_id: int) -> FileModel:
+    """The file with its ownership check in a single query (404 / 403)."""
+    row = (
+        db.query(FileModel, Task.created_by, Task.is_deleted)
+        .join(Task, Task.id == FileModel.task_id)
+        .filter(FileModel.id == file_id)
+        .first()
+    )
+
+    if not row:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    file, owner_id, task_deleted = row
+    if owner_id != user_id or task_deleted:
+        raise HTTPException(status_code=403, detail="Not allowed")
+
+    return file
+
+
+def _attachment(filename: str) -> str:
+    """Content-Disposition header value, as FileResponse builds it."""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+@router.api_route("/{file_id}", methods=["GET", "HEAD"])
+@db_route
 def download_file(
     file_id: int,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    file = db.get(FileModel, file_id)
+    """
+    Serves the file with validators for conditional and range requests:
+    a strong ETag from the content hash, Last-Modified from the upload
+    time, 304 for matching If-None-Match / If-Modified-Since, and 206
+    partial content for Range requests (FileResponse). With FILE_SERVE_MODE
+    set the bytes are left to the front proxy.
+    """
+    file = _owned_file(db, file_id, current_user.id)
 
-    if not file:
-        raise HTTPException(status_code=404, detail="File not found")
+    try:
+        stat_result = os.stat(file.path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File missing on server")
 
-    task = (
-        db.query(Task)
-        .filter(
-            Task.id == file.task_id,
-            Task.created_by == current_user.id,
-            Task.is_deleted == False,
-        )
-        .first()
+    headers = {"Cache-Control": CACHE_CONTROL}
+    if file.sha256:
+        headers["ETag"] = f'"{file.sha256}"'
+    headers["Last-Modified"] = http_date(
+        file.created_at or datetime.utcfromtimestamp(stat_result.st_mtime)
     )
 
-    if not task:
-        raise HTTPException(status_code=403, detail="Not allowed")
+    if not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
 
-    if not os.path.exists(file.path):
-        raise HTTPException(status_code=404, detail="File missing on server")
+    media_type = (
+        file.content_type
+        or mimetypes.guess_type(file.filename)[0]
+        or "application/octet-stream"
+    )
+
+    if FILE_SERVE_MODE in ("x-accel", "x-sendfile"):
+        if FILE_SERVE_MODE == "x-accel":
+            headers["X-Accel-Redirect"] = FILE_ACCEL_PREFIX + quote(
+                os.path.relpath(file.path, UPLOAD_DIR).replace(os.sep, "/")
+            )
+        else:
+            headers["X-Sendfile"] = os.path.abspath(file.path)
+        # Only the headers: the proxy serves the body (and ranges) itself
+        headers["Content-Disposition"] = _attachment(file.filename)
+        return Response(media_type=media_type, headers=headers)
 
     return FileResponse(
         path=file.path,
         filename=file.filename,
-        media_type="application/octet-stream",
+        media_type=media_type,
+        headers=headers,
+        stat_result=stat_result,
     )
 
 
 # --------------------
-# Delete file
+# File thumbnail
 # --------------------
-@router.delete("/{file_id}")
-def delete_file(
+@router.get("/{file_id}/thumbnail")
+async def get_thumbnail(
     file_id: int,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    file = db.get(FileModel, file_id)
+    """
+    JPEG thumbnail of an image / first PDF page (see thumbnails.py),
+    generated on demand if it does not exist yet.
+    """
+    file = await to_thread.run_sync(_owned_file, db, file_id, current_user.id)
 
-    if not file:
-        raise HTTPException(status_code=404, detail="File not found")
+    if not os.path.exists(file.path):
+        raise HTTPException(status_code=404, detail="File missing on server")
 
-    task = (
-        db.query(Task)
-        .filter(
-            Task.id == file.task_id,
-            Task.created_by == current_user.id,
-            Task.is_deleted == False,
-        )
-        .first()
-    )
+    # Files uploaded before content types were recorded have none
+    content_type = file.content_type or await to_thread.run_sync(sniff_file, file.path)
 
-    if not task:
-        raise HTTPException(status_code=403, detail="Not allowed")
+    path = await ensure_thumbnail(file.path, content_type)
+    if path is None:
+        raise HTTPException(status_code=404, detail="No thumbnail for this file")
+
+    headers = {"Cache-Control": CACHE_CONTROL}
+    if file.sha256:
+        headers["ETag"] = f'"{file.sha256}-thumb"'
+    if not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(path, media_type=THUMBNAIL_MEDIA_TYPE, headers=headers)
+
+
+# --------------------
+# Delete file
+# --------------------
+@router.delete("/{file_id}")
+@db_route
+def delete_file(
+    file_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    file = _owned_file(db, file_id, current_user.id)
 
-    if os.path.exists(file.path):
+    if file.blob_id is not None:
+        # Shared content: the blob is removed by gc once unreferenced
+        release_blob(db, file.blob_id)
+    elif os.path.exists(file.path):
         os.remove(file.path)
 
     db.delete(file)
+    bump_data_version(db, current_user.id)
     db.commit()
 
     return {"message": "File deleted successfully"}
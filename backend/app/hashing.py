@@ -0,0 +1,68 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from .config import (
+    BCRYPT_ROUNDS,
+    PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_MAX_PENDING,
+    PASSWORD_HASH_RETRY_AFTER,
+)
+from .instrumentation import timer
+
+# =========================================================
+# PASSWORD HASHING POOL
+# =========================================================
+# bcrypt takes 100-300 ms per call. Running it inside sync route handlers
+# holds one of Starlette's shared threadpool workers for that long, so a
+# burst of logins starves every other endpoint. Hashing runs on its own
+# small pool instead; when too many jobs are queued the request is
+# rejected with 503 + Retry-After rather than waiting indefinitely.
+
+pwd = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+)
+
+_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+async def hash_password(password: bytes) -> str:
+    return await _run(pwd.hash, password)
+
+
+async def verify_password(password: bytes, hashed: str) -> bool:
+    return await _run(pwd.verify, password, hashed)
+
+
+def pending_jobs() -> int:
+    return _pending
+
+
+async def _run(fn, *args):
+    global _pending
+
+    with _pending_lock:
+        if _pending >= PASSWORD_HASH_MAX_PENDING:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service busy, please retry",
+                headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)},
+            )
+        _pending += 1
+
+    try:
+        with timer("hash"):
+            return await asyncio.wrap_future(_executor.submit(fn, *args))
+    finally:
+        with _pending_lock:
+            _pending -= 1
@@ -0,0 +1,257 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import SLOW_QUERY_MS
+
+logger = logging.getLogger("app.instrumentation")
+
+# =========================================================
+# REQUEST INSTRUMENTATION
+# =========================================================
+# InstrumentationMiddleware opens a RequestStats for every HTTP request in a
+# context variable. Context variables follow the request into the threadpool
+# (sync routes) and into AsyncSession greenlets, so the SQLAlchemy cursor
+# events and timer() blocks below add to the stats of the request that
+# caused them.
+#
+# Per request the middleware then:
+# - sends a Server-Timing header (db, hash, file, app),
+# - records route latency, SQL count / time and response size histograms,
+#   exported in Prometheus text format at GET /metrics.
+
+
+class RequestStats:
+    __slots__ = ("queries", "sql_seconds", "timings")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        # name -> seconds, for timer() sections (password hashing, file I/O)
+        self.timings = {}
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+@contextmanager
+def timer(name: str):
+    """Adds the duration of the block to the current request's `name` timing."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.timings[name] = stats.timings.get(name, 0.0) + time.perf_counter() - started
+
+
+# =========================================================
+# METRICS REGISTRY (Prometheus text format)
+# =========================================================
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # labels -> [bucket counts..., +Inf count, sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.setdefault(labels, [0] * (len(self.buckets) + 2))
+            series[index] += 1
+            series[-1] += value
+
+    def render(self, label_names: tuple) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+            for labels, series in items:
+                base = _labels(label_names, labels)
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                    cumulative += count
+                    le = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{{{base + ',' if base else ''}{le}}} {cumulative}")
+                lines.append(f"{self.name}_sum{_braced(base)} {series[-1]}")
+                lines.append(f"{self.name}_count{_braced(base)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self, label_names: tuple) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_braced(_labels(label_names, labels))} {value}")
+        return lines
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    return ",".join(
+        f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)
+    )
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _braced(labels: str) -> str:
+    return f"{{{labels}}}" if labels else ""
+
+
+ROUTE_LABELS = ("method", "route")
+
+REQUESTS = Counter("http_requests_total", "HTTP requests by route and status code")
+LATENCY = Histogram("http_request_duration_seconds", "Request latency", LATENCY_BUCKETS)
+SQL_QUERIES = Histogram("http_request_sql_queries", "SQL statements per request", QUERY_COUNT_BUCKETS)
+SQL_TIME = Histogram("http_request_sql_seconds", "Time spent in SQL per request", LATENCY_BUCKETS)
+RESPONSE_SIZE = Histogram("http_response_size_bytes", "Response body size", SIZE_BUCKETS)
+SLOW_QUERIES = Counter("sql_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS")
+SLOW_QUERIES.inc((), 0)
+
+
+def render_metrics() -> str:
+    lines = REQUESTS.render(ROUTE_LABELS + ("status",))
+    for histogram in (LATENCY, SQL_QUERIES, SQL_TIME, RESPONSE_SIZE):
+        lines += histogram.render(ROUTE_LABELS)
+    lines += SLOW_QUERIES.render(())
+    return "\n".join(lines) + "\n"
+
+
+# =========================================================
+# SQL EVENTS
+# =========================================================
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.sql_seconds += elapsed
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        SLOW_QUERIES.inc(())
+        _log_slow_query(conn, statement, parameters, executemany, elapsed)
+
+
+# after_cursor_execute does not run for a failed statement (integrity
+# error, "database is locked"); conn.info lives as long as the pooled
+# connection, so its start time must be dropped here.
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    conn = context.connection
+    if conn is None or not conn.info.get("query_started"):
+        return
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.sql_seconds += elapsed
+
+
+def _log_slow_query(conn, statement, parameters, executemany, elapsed) -> None:
+    plan = None
+    if not executemany and statement.lstrip()[:6].upper() == "SELECT":
+        prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+        try:
+            # Straight on the DBAPI connection, bypassing these events
+            cursor = conn.connection.cursor()
+            try:
+                cursor.execute(prefix + statement, parameters)
+                plan = "\n".join(" ".join(str(col) for col in row) for row in cursor.fetchall())
+            finally:
+                cursor.close()
+        except Exception as exc:
+            plan = f"(EXPLAIN failed: {exc})"
+
+    logger.warning(
+        "Slow query (%.1f ms): %s\nParameters: %r%s",
+        elapsed * 1000,
+        statement,
+        parameters if not executemany else f"{len(parameters)} rows",
+        f"\nPlan:\n{plan}" if plan else "",
+    )
+
+
+# =========================================================
+# MIDDLEWARE
+# =========================================================
+class InstrumentationMiddleware:
+    """Pure ASGI middleware, so streamed responses are not buffered."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _server_timing(stats, started).encode("latin-1")))
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            labels = (scope["method"], route)
+            REQUESTS.inc(labels + (status_code,))
+            LATENCY.observe(labels, time.perf_counter() - started)
+            SQL_QUERIES.observe(labels, stats.queries)
+            SQL_TIME.observe(labels, stats.sql_seconds)
+            RESPONSE_SIZE.observe(labels, size)
+
+
+def _server_timing(stats: RequestStats, started: float) -> str:
+    entries = [f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.queries} queries"']
+    entries += [f"{name};dur={seconds * 1000:.1f}" for name, seconds in stats.timings.items()]
+    entries.append(f"app;dur={(time.perf_counter() - started) * 1000:.1f}")
+    return ", ".join(entries)
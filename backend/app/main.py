@@ -1,15 +1,21 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from .database import Base, engine
+from .database import Base, engine, read_engine, async_engine, async_read_engine, pool_stats
+from .deps import token_cache, user_cache
+from .analytics_cache import analytics_cache
+from .instrumentation import InstrumentationMiddleware, render_metrics
+from .migrations import run_migrations
 from .auth import router as auth_router
 from .tasks import router as task_router
 from .comments import router as comment_router
 from .files import router as file_router
 from .analytics import router as analytics_router
 
-# Create database tables
+# Create database tables and upgrade existing databases
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 app = FastAPI(
     title="Task Management System",
@@ -24,8 +30,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing"],
 )
 
+# Latency / SQL / response size metrics and Server-Timing headers
+app.add_middleware(InstrumentationMiddleware)
+
 # Register API routers
 app.include_router(auth_router)
 app.include_router(task_router)
@@ -37,3 +47,32 @@ app.include_router(analytics_router)
 @app.get("/", tags=["Health"])
 def health():
     return {"status": "ok"}
+
+
+@app.get("/health/cache", tags=["Health"])
+def cache_health():
+    return {
+        "auth_tokens": token_cache.stats(),
+        "auth_users": user_cache.stats(),
+        "analytics": analytics_cache.stats(),
+    }
+
+
+@app.get("/health/db", tags=["Health"])
+def db_health():
+    stats = {"primary": pool_stats(engine)}
+    if read_engine is not engine:
+        stats["read"] = pool_stats(read_engine)
+    if async_engine is not None:
+        stats["async_primary"] = pool_stats(async_engine.sync_engine)
+        if async_read_engine is not async_engine:
+            stats["async_read"] = pool_stats(async_read_engine.sync_engine)
+    return stats
+
+
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(
+        render_metrics(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -0,0 +1,87 @@
+from sqlalchemy import inspect, update
+from sqlalchemy.orm import Session
+
+from .database import Base
+from .models import Task
+from .search import setup_fts
+from .stats import backfill_stats, rebuild_stats
+
+
+# =========================================================
+# SCHEMA MIGRATIONS
+# =========================================================
+# Base.metadata.create_all() only creates missing tables; it never touches
+# tables that already exist in an older tasks.db. The steps below bring an
+# existing database up to date with the models and are safe to run on every
+# startup.
+
+def run_migrations(engine) -> None:
+    added = add_missing_columns(engine)
+    create_missing_indexes(engine)
+    setup_fts(engine)
+
+    if ("tasks", "completed_at") in added:
+        backfill_completed_at(engine)
+    else:
+        backfill_stats(engine)
+
+
+def add_missing_columns(engine) -> set:
+    """
+    Adds model columns that are missing from existing tables.
+    New columns are added as nullable (ALTER TABLE cannot add NOT NULL
+    columns without a default). Returns the added (table, column) pairs.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added = set()
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.exec_driver_sql(
+                    f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'
+                )
+                added.add((table.name, column.name))
+
+    return added
+
+
+def backfill_completed_at(engine) -> None:
+    """
+    Tasks completed before completed_at existed have no completion time;
+    their creation time is the best available approximation. The stats
+    tables are rebuilt since completions are now bucketed by that date.
+    """
+    with Session(engine) as db:
+        db.execute(
+            update(Task)
+            .where(Task.status == "done", Task.completed_at.is_(None))
+            .values(completed_at=Task.created_at)
+        )
+        rebuild_stats(db)
+        db.commit()
+
+
+def create_missing_indexes(engine) -> None:
+    """
+    Creates every index declared on the models that is missing
+    from the database (e.g. indexes added after the table was created).
+    """
+    existing_tables = set(inspect(engine).get_table_names())
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
@@ -3,9 +3,12 @@ from sqlalchemy import (
     Integer,
     String,
     Text,
+    Date,
     DateTime,
     Boolean,
-    ForeignKey
+    ForeignKey,
+    Index,
+    text,
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -21,6 +24,11 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     password = Column(String, nullable=False)
 
+    # Bumped on every write to the user's tasks, comments and files;
+    # drives the ETag / Last-Modified of their read endpoints.
+    data_version = Column(Integer, nullable=False, default=0)
+    data_modified_at = Column(DateTime)
+
     # Relationships 
     created_tasks = relationship(
         "Task",
@@ -35,8 +43,34 @@ class User(Base):
     comments = relationship("Comment", back_populates="user")
 
 
+# Partial index predicate shared by the per-user task indexes.
+# Every list / export / analytics query filters on live (non-deleted) rows.
+LIVE_TASKS_SQLITE = text("is_deleted = 0")
+LIVE_TASKS_POSTGRES = text("is_deleted = false")
+
+
+def live_task_index(name, *columns):
+    return Index(
+        name,
+        *columns,
+        sqlite_where=LIVE_TASKS_SQLITE,
+        postgresql_where=LIVE_TASKS_POSTGRES,
+    )
+
+
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # (created_by, <sort column>) for the task list and its keyset cursor
+        live_task_index("ix_tasks_live_owner_created_at", "created_by", "created_at"),
+        live_task_index("ix_tasks_live_owner_due_date", "created_by", "due_date"),
+        live_task_index("ix_tasks_live_owner_title", "created_by", "title"),
+        # (created_by, status) also serves the analytics GROUP BY status
+        live_task_index("ix_tasks_live_owner_status", "created_by", "status"),
+        live_task_index("ix_tasks_live_owner_priority", "created_by", "priority"),
+        # completion-window range queries (completion trends, cycle time)
+        live_task_index("ix_tasks_live_owner_completed_at", "created_by", "completed_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     title = Column(String, index=True, nullable=False)
@@ -51,6 +85,8 @@ class Task(Base):
 
     is_deleted = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    # Set when the task moves into "done", cleared when it moves out
+    completed_at = Column(DateTime)
 
     # Relationships
     creator = relationship(
@@ -73,6 +109,24 @@ class Task(Base):
         back_populates="task",
         cascade="all, delete-orphan"
     )
+    status_changes = relationship(
+        "TaskStatusChange",
+        back_populates="task",
+        cascade="all, delete-orphan"
+    )
+
+
+class TaskStatusChange(Base):
+    __tablename__ = "task_status_history"
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, ForeignKey("tasks.id"), index=True, nullable=False)
+    from_status = Column(String)
+    to_status = Column(String, nullable=False)
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Relationships
+    task = relationship("Task", back_populates="status_changes")
 
 
 class Comment(Base):
@@ -80,7 +134,7 @@ class Comment(Base):
 
     id = Column(Integer, primary_key=True)
     content = Column(Text, nullable=False)
-    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    task_id = Column(Integer, ForeignKey("tasks.id"), index=True, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -95,7 +149,59 @@ class File(Base):
     id = Column(Integer, primary_key=True)
     filename = Column(String, nullable=False)
     path = Column(String, nullable=False)
-    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    task_id = Column(Integer, ForeignKey("tasks.id"), index=True, nullable=False)
+    # Recorded on upload (NULL for files stored before they were tracked)
+    size = Column(Integer)
+    content_type = Column(String)
+    sha256 = Column(String(64))
+    # Shared content (NULL for files stored before the blob store; those
+    # own their path)
+    blob_id = Column(Integer, ForeignKey("blobs.id"), index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
     task = relationship("Task", back_populates="files")
+
+
+class Blob(Base):
+    """
+    One stored file body, shared by every File with the same content.
+    ref_count is the number of File rows using it; unreferenced blobs
+    are removed by `python -m app.storage gc` (see storage.py).
+    """
+    __tablename__ = "blobs"
+
+    id = Column(Integer, primary_key=True)
+    sha256 = Column(String(64), unique=True, nullable=False)
+    size = Column(Integer, nullable=False)
+    content_type = Column(String)
+    path = Column(String, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    # When ref_count last dropped to 0
+    released_at = Column(DateTime)
+
+
+class TaskStat(Base):
+    """
+    Live (non-deleted) task count per user x status x priority.
+    Maintained incrementally by the task write paths (see stats.py).
+    """
+    __tablename__ = "task_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    status = Column(String, primary_key=True)
+    priority = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class TaskDailyStat(Base):
+    """
+    Per-user, per-day buckets: live tasks created that day
+    and live tasks completed (completed_at) that day.
+    """
+    __tablename__ = "task_daily_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    created = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,94 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+# Opaque keyset cursors for list endpoints.
+#
+# A cursor encodes the sort field, the sort order and the (value, id) pair of
+# the last row that was returned. The next page is fetched with a WHERE clause
+# that seeks past that row instead of an OFFSET, so the cost of a page does not
+# grow with its position in the result set.
+
+
+def encode_cursor(sort_by: str, order: str, value, row_id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+
+    raw = json.dumps([sort_by, order, value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, order: str, column):
+    """
+    Returns the (value, id) pair stored in the cursor.
+    Raises HTTPException if the cursor is malformed or was issued
+    for a different sort field / order.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii"))
+        cursor_sort_by, cursor_order, value, row_id = json.loads(raw)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if cursor_sort_by != sort_by or cursor_order != order or not isinstance(row_id, int):
+        raise HTTPException(
+            status_code=400,
+            detail="Cursor does not match the requested sort",
+        )
+
+    if value is not None and _is_datetime_column(column):
+        try:
+            value = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return value, row_id
+
+
+def order_by_clauses(column, id_column, descending: bool):
+    """
+    ORDER BY clauses for a keyset-paginated query.
+    NULLs sort first ascending and last descending (SQLite's native order),
+    and the id column breaks ties so every row has a unique position.
+    """
+    if descending:
+        return [column.desc().nulls_last(), id_column.desc()]
+    return [column.asc().nulls_first(), id_column.asc()]
+
+
+def seek_after(column, id_column, descending: bool, value, row_id: int):
+    """
+    WHERE clause selecting the rows that come after (value, row_id)
+    in the ordering produced by order_by_clauses().
+    """
+    if descending:
+        if value is None:
+            # NULLs are last: only the remaining NULL rows follow.
+            return and_(column.is_(None), id_column < row_id)
+        return or_(
+            column < value,
+            and_(column == value, id_column < row_id),
+            column.is_(None),
+        )
+
+    if value is None:
+        # NULLs are first: remaining NULL rows, then every non-NULL row.
+        return or_(
+            and_(column.is_(None), id_column > row_id),
+            column.isnot(None),
+        )
+    return or_(
+        column > value,
+        and_(column == value, id_column > row_id),
+    )
+
+
+def _is_datetime_column(column) -> bool:
+    try:
+        return column.type.python_type is datetime
+    except NotImplementedError:
+        return False
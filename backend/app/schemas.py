@@ -75,6 +75,7 @@ class TaskOut(BaseModel):
     assigned_to: Optional[int]
     created_by: int
     created_at: datetime
+    completed_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -103,6 +104,17 @@ class CommentOut(BaseModel):
         from_attributes = True
 
 
+class TaskDetailOut(TaskOut):
+    """
+    TaskOut plus the related data requested with `include=`.
+    Fields that were not requested are left out of the response.
+    """
+    comment_count: Optional[int] = None
+    file_count: Optional[int] = None
+    latest_comment: Optional[CommentOut] = None
+    assignee_name: Optional[str] = None
+
+
 # --------------------
 # File Schemas
 # --------------------
@@ -0,0 +1,170 @@
+import re
+
+from sqlalchemy import Float, column, func, select, table
+from sqlalchemy.exc import OperationalError
+
+from .models import Task
+
+# =========================================================
+# FULL-TEXT SEARCH (SQLite FTS5)
+# =========================================================
+# tasks_fts is an external-content FTS5 index over tasks.title,
+# tasks.description and tasks.tags. Triggers keep it in sync with the tasks
+# table; soft-deleted tasks are removed from the index so they never match.
+#
+# On backends without FTS5 (or non-SQLite databases) search falls back to the
+# original case-insensitive LIKE on the title.
+
+FTS_TABLE = "tasks_fts"
+
+# Column weights for bm25(): a hit in the title counts more than in tags,
+# which counts more than in the description.
+BM25_WEIGHTS = (10.0, 1.0, 3.0)
+
+fts = table(FTS_TABLE, column("rowid"), column(FTS_TABLE))
+
+_fts_enabled = False
+
+_FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, description, tags,
+        content='tasks', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON tasks
+    WHEN NOT coalesce(new.is_deleted, 0)
+    BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, tags)
+        VALUES (new.id, new.title, new.description, new.tags);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON tasks
+    WHEN NOT coalesce(old.is_deleted, 0)
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, tags)
+        VALUES ('delete', old.id, old.title, old.description, old.tags);
+    END
+    """,
+    # One trigger for updates so the old entry is always removed
+    # before the new one is added (FTS5 rowids must stay unique).
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+    AFTER UPDATE OF title, description, tags, is_deleted ON tasks
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, tags)
+        SELECT 'delete', old.id, old.title, old.description, old.tags
+        WHERE NOT coalesce(old.is_deleted, 0);
+        INSERT INTO {FTS_TABLE}(rowid, title, description, tags)
+        SELECT new.id, new.title, new.description, new.tags
+        WHERE NOT coalesce(new.is_deleted, 0);
+    END
+    """,
+]
+
+
+def setup_fts(engine) -> bool:
+    """
+    Creates the FTS5 index and its sync triggers if they are missing,
+    indexing existing live tasks on first creation.
+    Returns whether full-text search is available.
+    """
+    global _fts_enabled
+
+    if engine.dialect.name != "sqlite":
+        _fts_enabled = False
+        return False
+
+    try:
+        with engine.begin() as conn:
+            exists = conn.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                (FTS_TABLE,),
+            ).first()
+
+            if not exists:
+                for ddl in _FTS_DDL:
+                    conn.exec_driver_sql(ddl)
+                conn.exec_driver_sql(
+                    f"""
+                    INSERT INTO {FTS_TABLE}(rowid, title, description, tags)
+                    SELECT id, title, description, tags FROM tasks
+                    WHERE NOT coalesce(is_deleted, 0)
+                    """
+                )
+            else:
+                for ddl in _FTS_DDL[1:]:
+                    conn.exec_driver_sql(ddl)
+    except OperationalError:
+        # SQLite was built without FTS5
+        _fts_enabled = False
+        return False
+
+    _fts_enabled = True
+    return True
+
+
+def fts_enabled() -> bool:
+    return _fts_enabled
+
+
+def build_match_expression(search: str) -> str | None:
+    """
+    Turns free text into an FTS5 query: every word must match,
+    as a prefix, in any indexed column. Quoting each term keeps
+    FTS5 operators in user input from being interpreted.
+    """
+    terms = re.findall(r"\w+", search, flags=re.UNICODE)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def apply_search(query, search: str, ranked: bool = False):
+    """
+    Restricts a Task query to rows matching `search`.
+    Returns (query, rank_column); rank_column is the bm25 score
+    (lower is better) when `ranked` is requested and FTS is available,
+    else None.
+
+    Only the ranked form joins the FTS matches onto tasks: SQLite then
+    drives the join from the tasks side (one FTS probe per owned task),
+    which is only worth it when the rank is needed. Otherwise the matches
+    are filtered with an IN (subquery), evaluated once.
+    """
+    expression = build_match_expression(search) if _fts_enabled else None
+
+    if expression is None or not ranked:
+        return query.filter(search_condition(search)), None
+
+    matches = (
+        select(
+            fts.c.rowid.label("task_id"),
+            func.bm25(fts.c[FTS_TABLE], *BM25_WEIGHTS, type_=Float).label("rank"),
+        )
+        .where(fts.c[FTS_TABLE].match(expression))
+        .subquery("search_matches")
+    )
+
+    query = query.join(matches, matches.c.task_id == Task.id)
+    return query, matches.c.rank
+
+
+def search_condition(search: str):
+    """
+    WHERE clause form of apply_search(): task ids IN the FTS matches
+    (also usable in statements that cannot join, e.g. bulk UPDATE).
+    No ranking.
+    """
+    expression = build_match_expression(search) if _fts_enabled else None
+
+    if expression is None:
+        return Task.title.ilike(f"%{search}%")
+
+    return Task.id.in_(
+        select(fts.c.rowid).where(fts.c[FTS_TABLE].match(expression))
+    )
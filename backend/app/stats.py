@@ -0,0 +1,347 @@
+import argparse
+from collections import Counter
+from datetime import date
+from typing import Iterable, NamedTuple, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from .models import Task, TaskStat, TaskDailyStat
+
+# =========================================================
+# MATERIALIZED TASK STATISTICS
+# =========================================================
+# task_stats and task_daily_stats hold pre-aggregated counters so the
+# analytics endpoints read O(buckets) rows instead of re-counting every task.
+#
+# Every write path that changes a task records the task's contribution
+# before and after the change; the difference is applied with an upsert in
+# the same transaction as the write, so the counters never drift from the
+# tasks table. `python -m app.stats check` / `rebuild` verify and recompute
+# them from scratch.
+
+
+class TaskContribution(NamedTuple):
+    """What one live task adds to the counters."""
+    user_id: int
+    status: str
+    priority: str
+    created_day: object
+    completed_day: object
+
+
+def contribution(task: Task) -> Optional[TaskContribution]:
+    """
+    Snapshot of a task's counter contribution; None for deleted tasks.
+    Must be taken after the task has been flushed (created_at is set).
+    """
+    if task.is_deleted:
+        return None
+
+    return contribution_of(
+        task.created_by,
+        task.status,
+        task.priority,
+        task.created_at,
+        task.completed_at,
+    )
+
+
+def contribution_of(user_id, status, priority, created_at, completed_at) -> TaskContribution:
+    """Contribution of a live task given its column values."""
+    task_status = _value(status)
+    if task_status != "done":
+        completed_at = None
+
+    return TaskContribution(
+        user_id=user_id,
+        status=task_status,
+        priority=_value(priority),
+        created_day=created_at.date(),
+        completed_day=completed_at.date() if completed_at else None,
+    )
+
+
+def record_changes(
+    db: Session,
+    changes: Iterable[tuple[Optional[TaskContribution], Optional[TaskContribution]]],
+) -> None:
+    """
+    Applies (before, after) contribution pairs to the counters.
+    Pass None as `before` for new tasks and as `after` for deleted ones.
+    """
+    record_grouped_changes(db, ((before, after, 1) for before, after in changes))
+
+
+def record_grouped_changes(
+    db: Session,
+    changes: Iterable[tuple[Optional[TaskContribution], Optional[TaskContribution], int]],
+) -> None:
+    """
+    Like record_changes(), with a task count per (before, after) pair,
+    for set-based writes that change many identical-looking tasks.
+    """
+    counters = Counter()
+    daily_created = Counter()
+    daily_completed = Counter()
+
+    for before, after, tasks in changes:
+        if before == after:
+            continue
+        for item, sign in ((before, -tasks), (after, tasks)):
+            if item is None:
+                continue
+            counters[(item.user_id, item.status, item.priority)] += sign
+            daily_created[(item.user_id, item.created_day)] += sign
+            if item.completed_day is not None:
+                daily_completed[(item.user_id, item.completed_day)] += sign
+
+    counter_rows = [
+        {"user_id": user_id, "status": task_status, "priority": priority, "count": delta}
+        for (user_id, task_status, priority), delta in counters.items()
+        if delta
+    ]
+    daily_rows = [
+        {
+            "user_id": user_id,
+            "day": day,
+            "created": daily_created[(user_id, day)],
+            "completed": daily_completed[(user_id, day)],
+        }
+        for user_id, day in set(daily_created) | set(daily_completed)
+        if daily_created[(user_id, day)] or daily_completed[(user_id, day)]
+    ]
+
+    if counter_rows:
+        _upsert_add(db, TaskStat, ["user_id", "status", "priority"], ["count"], counter_rows)
+    if daily_rows:
+        _upsert_add(db, TaskDailyStat, ["user_id", "day"], ["created", "completed"], daily_rows)
+
+
+def record_change(db: Session, before, after) -> None:
+    record_changes(db, [(before, after)])
+
+
+def _upsert_add(db: Session, model, keys, counters, rows) -> None:
+    """
+    INSERT ... ON CONFLICT DO UPDATE SET counter = counter + excluded.counter
+    """
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        dialect_insert = None
+
+    if dialect_insert is None:
+        # Generic fallback: update existing buckets, insert missing ones
+        table = model.__table__
+        for row in rows:
+            where = [table.c[key] == row[key] for key in keys]
+            result = db.execute(
+                table.update()
+                .where(*where)
+                .values({name: table.c[name] + row[name] for name in counters})
+            )
+            if result.rowcount == 0:
+                db.execute(insert(table).values(row))
+        return
+
+    stmt = dialect_insert(model.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={
+            name: model.__table__.c[name] + stmt.excluded[name]
+            for name in counters
+        },
+    )
+    db.execute(stmt, rows)
+
+
+def _value(value):
+    # Enum members (TaskStatus / TaskPriority) are stored by value
+    return getattr(value, "value", value)
+
+
+# =========================================================
+# READS
+# =========================================================
+def read_counters(db: Session, user_id: int):
+    """(status, priority, count) rows for a user."""
+    return (
+        db.query(TaskStat.status, TaskStat.priority, TaskStat.count)
+        .filter(TaskStat.user_id == user_id, TaskStat.count != 0)
+        .all()
+    )
+
+
+def read_daily(db: Session, user_id: int, start=None, end=None):
+    """(day, created, completed) rows for a user, oldest first."""
+    query = db.query(
+        TaskDailyStat.day, TaskDailyStat.created, TaskDailyStat.completed
+    ).filter(
+        TaskDailyStat.user_id == user_id,
+        (TaskDailyStat.created != 0) | (TaskDailyStat.completed != 0),
+    )
+
+    if start is not None:
+        query = query.filter(TaskDailyStat.day >= start)
+    if end is not None:
+        query = query.filter(TaskDailyStat.day <= end)
+
+    return query.order_by(TaskDailyStat.day).all()
+
+
+# =========================================================
+# REBUILD / DRIFT CHECK
+# =========================================================
+def _live_counters_query():
+    return (
+        select(
+            Task.created_by,
+            Task.status,
+            Task.priority,
+            func.count(Task.id),
+        )
+        .where(Task.is_deleted == False)
+        .group_by(Task.created_by, Task.status, Task.priority)
+    )
+
+
+def _live_daily(db: Session) -> dict:
+    """
+    {(user_id, day): (created, completed)} aggregated from the tasks table.
+    """
+    buckets = {}
+
+    created_day = func.date(Task.created_at)
+    completed_day = func.date(Task.completed_at)
+
+    created_rows = db.execute(
+        select(Task.created_by, created_day, func.count(Task.id))
+        .where(Task.is_deleted == False)
+        .group_by(Task.created_by, created_day)
+    )
+    for user_id, day, count in created_rows:
+        buckets[(user_id, as_date(day))] = [count, 0]
+
+    completed_rows = db.execute(
+        select(Task.created_by, completed_day, func.count(Task.id))
+        .where(
+            Task.is_deleted == False,
+            Task.status == "done",
+            Task.completed_at.isnot(None),
+        )
+        .group_by(Task.created_by, completed_day)
+    )
+    for user_id, day, count in completed_rows:
+        buckets.setdefault((user_id, as_date(day)), [0, 0])[1] = count
+
+    return {key: tuple(value) for key, value in buckets.items()}
+
+
+def as_date(value):
+    # SQLite returns date() results as strings
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+
+def rebuild_stats(db: Session) -> None:
+    """Recomputes both stats tables from the tasks table."""
+    db.flush()
+    db.execute(delete(TaskStat))
+    db.execute(delete(TaskDailyStat))
+    db.execute(
+        insert(TaskStat).from_select(
+            ["user_id", "status", "priority", "count"],
+            _live_counters_query(),
+        )
+    )
+    daily_rows = [
+        {"user_id": user_id, "day": day, "created": created, "completed": completed}
+        for (user_id, day), (created, completed) in _live_daily(db).items()
+    ]
+    if daily_rows:
+        db.execute(insert(TaskDailyStat), daily_rows)
+
+
+def check_stats(db: Session) -> list[str]:
+    """
+    Compares the stats tables with a fresh aggregation.
+    Returns one line per drifted bucket (empty when in sync).
+    """
+    drift = []
+
+    expected = {
+        (user_id, task_status, priority): count
+        for user_id, task_status, priority, count in db.execute(_live_counters_query())
+    }
+    actual = {
+        (row.user_id, row.status, row.priority): row.count
+        for row in db.query(TaskStat).filter(TaskStat.count != 0)
+    }
+    for key in sorted(set(expected) | set(actual), key=str):
+        if expected.get(key, 0) != actual.get(key, 0):
+            drift.append(
+                f"task_stats {key}: expected {expected.get(key, 0)}, found {actual.get(key, 0)}"
+            )
+
+    expected_daily = _live_daily(db)
+    actual_daily = {
+        (row.user_id, row.day): (row.created, row.completed)
+        for row in db.query(TaskDailyStat).filter(
+            (TaskDailyStat.created != 0) | (TaskDailyStat.completed != 0)
+        )
+    }
+    for key in sorted(set(expected_daily) | set(actual_daily)):
+        if expected_daily.get(key, (0, 0)) != actual_daily.get(key, (0, 0)):
+            drift.append(
+                f"task_daily_stats {key}: expected {expected_daily.get(key, (0, 0))}, "
+                f"found {actual_daily.get(key, (0, 0))}"
+            )
+
+    return drift
+
+
+def backfill_stats(engine) -> None:
+    """
+    Builds the stats tables for databases created before they existed.
+    """
+    with Session(engine) as db:
+        has_stats = db.query(TaskStat.user_id).first() is not None
+        has_tasks = db.query(Task.id).filter(Task.is_deleted == False).first() is not None
+        if has_tasks and not has_stats:
+            rebuild_stats(db)
+            db.commit()
+
+
+def main(argv=None) -> int:
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain the materialized task statistics")
+    parser.add_argument("command", choices=["check", "rebuild"])
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            drift = check_stats(db)
+            rebuild_stats(db)
+            db.commit()
+            print(f"Rebuilt task stats ({len(drift)} drifted buckets fixed)")
+            return 0
+
+        drift = check_stats(db)
+        for line in drift:
+            print(line)
+        print("Task stats are in sync" if not drift else f"{len(drift)} drifted buckets")
+        return 1 if drift else 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
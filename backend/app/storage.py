@@ -0,0 +1,445 @@
+import argparse
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from uuid import uuid4
+
+from fastapi import HTTPException
+from sqlalchemy import and_, case, delete, func, insert, not_, select, update
+from sqlalchemy.orm import Session
+
+try:
+    from python_multipart import MultipartParser
+    from python_multipart.exceptions import MultipartParseError
+    from python_multipart.multipart import parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart import MultipartParser
+    from multipart.exceptions import MultipartParseError
+    from multipart.multipart import parse_options_header
+
+from .instrumentation import timer
+from .models import Blob
+from .utils import ALLOWED_FILE_TYPES, MAX_FILE_SIZE
+
+# =========================================================
+# FILE STORAGE
+# =========================================================
+# Uploads are parsed straight off the request body instead of going through
+# Starlette's form parser (which spools every file to memory / a temp file
+# before the route runs). Each chunk of the file part is, in one pass:
+# - checked against MAX_FILE_SIZE (the upload is aborted as soon as it is
+#   exceeded, without reading the rest of the body),
+# - hashed (SHA-256),
+# - written to a hidden ".part" file in UPLOAD_DIR.
+# The content type is sniffed from the first bytes before anything is
+# written. Once the part is complete the temp file is renamed into the blob
+# store, so a stored path never points at a partial file.
+#
+# Blob store: file bodies are content-addressed, stored once per SHA-256 at
+# uploads/blobs/ab/cd/abcd... (two levels of 256 shard directories). An
+# upload whose content is already stored just drops its temp file. Each
+# File row references a Blob row whose ref_count counts those files;
+# deleting a file only decrements it. `python -m app.storage gc` removes
+# blobs that stayed unreferenced for a grace period, stray blob files and
+# abandoned .part files. Files derived from a blob (thumbnails) are named
+# after its hash and go with it.
+#
+# Uploads touch (or create) the blob file before committing their row, and
+# gc only removes files older than the grace period, so a blob that is
+# being re-uploaded while gc runs is never deleted from under it.
+
+UPLOAD_DIR = "uploads"
+BLOB_DIR = os.path.join(UPLOAD_DIR, "blobs")
+
+# Seconds an unreferenced blob / temp file is kept before gc removes it
+GC_GRACE_SECONDS = 3600
+
+# Leading bytes of every accepted file type
+SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"%PDF-", "application/pdf"),
+)
+SNIFF_BYTES = max(len(signature) for signature, _ in SIGNATURES)
+
+# Allowance for boundaries and part headers on top of the file size when
+# rejecting requests up front by their Content-Length
+MULTIPART_OVERHEAD = 16 * 1024
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """MIME type detected from the first bytes of a file, if accepted."""
+    for signature, content_type in SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return None
+
+
+def sniff_file(path: str) -> Optional[str]:
+    """sniff_content_type() of a stored file."""
+    with open(path, "rb") as stored:
+        return sniff_content_type(stored.read(SNIFF_BYTES))
+
+
+def check_content_length(content_length: Optional[str], max_files: int = 1) -> None:
+    """Rejects bodies that announce more than max_files full-size files."""
+    if content_length and content_length.isdigit():
+        if int(content_length) > max_files * (MAX_FILE_SIZE + MULTIPART_OVERHEAD):
+            raise HTTPException(status_code=400, detail="File size exceeds 5MB limit")
+
+
+def safe_filename(filename: str) -> str:
+    """Client file name without any directory components."""
+    return os.path.basename(filename.replace("\\", "/")) or "upload"
+
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(BLOB_DIR, sha256[:2], sha256[2:4], sha256)
+
+
+class StoredFile:
+    """A completely written upload, stored in the blob store."""
+
+    def __init__(self, filename: str, path: str, size: int, sha256: str, content_type: str):
+        self.filename = filename
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.content_type = content_type
+
+
+class UploadWriter:
+    """Streams one file part to disk, hashing and size-checking each chunk."""
+
+    def __init__(self, filename: str):
+        self.filename = safe_filename(filename)
+        self.size = 0
+        self.content_type = None
+        self._sha256 = hashlib.sha256()
+        self._head = b""
+        self._temp_path = os.path.join(UPLOAD_DIR, f".{uuid4().hex}.part")
+        self._file = None
+
+    def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > MAX_FILE_SIZE:
+            raise HTTPException(status_code=400, detail="File size exceeds 5MB limit")
+        self._sha256.update(data)
+
+        if self._file is None:
+            # Hold back the first bytes until the type can be sniffed
+            self._head += data
+            if len(self._head) < SNIFF_BYTES:
+                return
+            data = self._open()
+
+        with timer("file"):
+            self._file.write(data)
+
+    def finish(self) -> StoredFile:
+        if self._file is None:
+            data = self._open()
+            with timer("file"):
+                self._file.write(data)
+
+        sha256 = self._sha256.hexdigest()
+        path = blob_path(sha256)
+        with timer("file"):
+            self._file.close()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(path):
+                # Same content already stored: keep that copy, marked as
+                # recently used for gc
+                os.utime(path)
+                os.remove(self._temp_path)
+            else:
+                os.replace(self._temp_path, path)
+
+        return StoredFile(
+            filename=self.filename,
+            path=path,
+            size=self.size,
+            sha256=sha256,
+            content_type=self.content_type,
+        )
+
+    def abort(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            os.remove(self._temp_path)
+
+    def _open(self) -> bytes:
+        """Sniffs the buffered head, opens the temp file and returns the head."""
+        self.content_type = sniff_content_type(self._head)
+        if self.content_type not in ALLOWED_FILE_TYPES:
+            raise HTTPException(status_code=400, detail="Unsupported file type")
+
+        os.makedirs(UPLOAD_DIR, exist_ok=True)
+        self._file = open(self._temp_path, "wb")
+        head, self._head = self._head, b""
+        return head
+
+
+class UploadError:
+    """A file part that was rejected (not stored)."""
+
+    def __init__(self, filename: str, detail: str):
+        self.filename = filename
+        self.detail = detail
+
+
+def receive_upload(next_chunk, content_type: str, field: str) -> StoredFile:
+    """
+    Parses a multipart/form-data body and stores its `field` file part.
+    next_chunk() returns the next body chunk (None at the end); reading
+    stops once the file part is complete. Blocking: run in a worker thread.
+    """
+    results = receive_uploads(next_chunk, content_type, field, max_files=1, fail_fast=True)
+    if not results:
+        raise HTTPException(status_code=400, detail=f"Missing file field '{field}'")
+    return results[0]
+
+
+def receive_uploads(
+    next_chunk,
+    content_type: str,
+    field: str,
+    max_files: int,
+    fail_fast: bool = False,
+) -> list:
+    """
+    Stores every `field` file part of a multipart/form-data body, in body
+    order, and returns a StoredFile or UploadError for each. A rejected
+    part (type, size, over max_files) is skipped and the next one is read;
+    with fail_fast the rejection is raised instead and reading stops after
+    max_files parts.
+    """
+    mime_type, options = parse_options_header(content_type)
+    boundary = options.get(b"boundary")
+    if mime_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+
+    results = []
+    state = {"header_field": b"", "header_value": b"", "headers": {}, "writer": None}
+
+    def reject(filename: str, exc: HTTPException) -> None:
+        if state["writer"] is not None:
+            state["writer"].abort()
+            state["writer"] = None
+        if fail_fast:
+            raise exc
+        results.append(UploadError(filename, exc.detail))
+
+    def on_part_begin():
+        state["headers"] = {}
+
+    def on_header_field(data, start, end):
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["header_field"].lower()] = state["header_value"]
+        state["header_field"] = state["header_value"] = b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(state["headers"].get(b"content-disposition"))
+        name = disposition.get(b"name", b"").decode("latin-1")
+        filename = disposition.get(b"filename")
+        if name != field or filename is None:
+            return
+
+        filename = safe_filename(filename.decode("utf-8", "replace"))
+        if len(results) >= max_files:
+            reject(filename, HTTPException(status_code=400, detail="Too many files in one request"))
+            return
+
+        declared = state["headers"].get(b"content-type", b"").decode("latin-1")
+        if declared not in ALLOWED_FILE_TYPES:
+            reject(filename, HTTPException(status_code=400, detail="Unsupported file type"))
+            return
+        state["writer"] = UploadWriter(filename)
+
+    def on_part_data(data, start, end):
+        writer = state["writer"]
+        if writer is not None:
+            try:
+                writer.write(data[start:end])
+            except HTTPException as exc:
+                reject(writer.filename, exc)
+
+    def on_part_end():
+        writer = state["writer"]
+        if writer is not None:
+            try:
+                results.append(writer.finish())
+            except HTTPException as exc:
+                reject(writer.filename, exc)
+            state["writer"] = None
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    try:
+        while not (fail_fast and len(results) >= max_files):
+            chunk = next_chunk()
+            if chunk is None:
+                break
+            parser.write(chunk)
+    except BaseException as exc:
+        if state["writer"] is not None:
+            state["writer"].abort()
+        if isinstance(exc, MultipartParseError):
+            raise HTTPException(status_code=400, detail="Malformed multipart body")
+        raise
+
+    if state["writer"] is not None:
+        # Body ended inside a file part
+        state["writer"].abort()
+        raise HTTPException(status_code=400, detail="Malformed multipart body")
+    return results
+
+
+# =========================================================
+# BLOB REFERENCES
+# =========================================================
+def acquire_blob(db: Session, stored: StoredFile, references: int = 1) -> int:
+    """
+    Adds `references` references to the blob holding `stored` (creating
+    its row on the first reference) and returns the blob id. Part of the
+    caller's transaction.
+    """
+    row = {
+        "sha256": stored.sha256,
+        "size": stored.size,
+        "content_type": stored.content_type,
+        "path": stored.path,
+        "ref_count": references,
+    }
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        dialect_insert = None
+
+    if dialect_insert is None:
+        # Generic fallback: reference an existing row, insert a missing one
+        blob_id = db.execute(
+            select(Blob.id).where(Blob.sha256 == stored.sha256).with_for_update()
+        ).scalar()
+        if blob_id is None:
+            return db.execute(insert(Blob).values(row).returning(Blob.id)).scalar_one()
+        db.execute(
+            update(Blob)
+            .where(Blob.id == blob_id)
+            .values(ref_count=Blob.ref_count + references, released_at=None)
+        )
+        return blob_id
+
+    stmt = dialect_insert(Blob).values(row)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["sha256"],
+        set_={"ref_count": Blob.ref_count + references, "released_at": None},
+    )
+    return db.execute(stmt.returning(Blob.id)).scalar_one()
+
+
+def release_blob(db: Session, blob_id: int) -> None:
+    """Drops one reference; the file itself is left for gc."""
+    db.execute(
+        update(Blob)
+        .where(Blob.id == blob_id)
+        .values(
+            ref_count=Blob.ref_count - 1,
+            released_at=case((Blob.ref_count <= 1, datetime.utcnow()), else_=Blob.released_at),
+        )
+    )
+
+
+# =========================================================
+# GARBAGE COLLECTION
+# =========================================================
+def collect_garbage(db: Session, grace_seconds: int = GC_GRACE_SECONDS, dry_run: bool = False) -> dict:
+    """
+    Deletes blob rows unreferenced for longer than grace_seconds, then
+    removes blob files without a row and abandoned temp files that are
+    older than grace_seconds.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    summary = {"blobs": 0, "files": 0, "temp_files": 0, "bytes": 0}
+
+    expired = and_(Blob.ref_count <= 0, Blob.released_at < cutoff)
+    if dry_run:
+        summary["blobs"] = db.execute(select(func.count()).select_from(Blob).where(expired)).scalar()
+    else:
+        summary["blobs"] = db.execute(delete(Blob).where(expired)).rowcount
+        db.commit()
+
+    known = set(db.execute(select(Blob.sha256).where(not_(expired))).scalars())
+    oldest = time.time() - grace_seconds
+
+    def remove(path: str, key: str) -> None:
+        stat = os.stat(path)
+        if stat.st_mtime >= oldest:
+            return
+        summary[key] += 1
+        summary["bytes"] += stat.st_size
+        if not dry_run:
+            os.remove(path)
+
+    if os.path.isdir(BLOB_DIR):
+        for directory, _, names in os.walk(BLOB_DIR):
+            for name in names:
+                # Blobs and their derived files (<sha256>.thumb.jpg)
+                if name.endswith(".part") or name.split(".", 1)[0] not in known:
+                    remove(os.path.join(directory, name), "files")
+
+    if os.path.isdir(UPLOAD_DIR):
+        for name in os.listdir(UPLOAD_DIR):
+            if name.startswith(".") and name.endswith(".part"):
+                remove(os.path.join(UPLOAD_DIR, name), "temp_files")
+
+    return summary
+
+
+def main(argv=None) -> int:
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain the attachment blob store")
+    parser.add_argument("command", choices=["gc"])
+    parser.add_argument(
+        "--grace-seconds", type=int, default=GC_GRACE_SECONDS,
+        help="Keep unreferenced blobs and temp files younger than this",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be removed")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        summary = collect_garbage(db, args.grace_seconds, args.dry_run)
+    finally:
+        db.close()
+
+    verb = "Would remove" if args.dry_run else "Removed"
+    print(
+        f"{verb} {summary['blobs']} unreferenced blobs, {summary['files']} blob files "
+        f"and {summary['temp_files']} temp files ({summary['bytes'] / 2**20:.1f} MiB)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,31 +1,89 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import asc, desc
+from sqlalchemy import case, func, insert, literal
+from anyio import from_thread, to_thread
+from pydantic import ValidationError
 from typing import List, Optional
-from pydantic import BaseModel
-from fastapi.responses import StreamingResponse, JSONResponse
-from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, Field
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+import codecs
 import csv
 import io
-
-from .deps import get_db, get_current_user
-from .models import Task, User
-from .schemas import TaskCreate, TaskUpdate, TaskOut
+import json
+import zlib
+
+from .database import ReadSessionLocal
+from .deps import get_db, get_read_db, get_current_user, db_route
+from .conditional import bump_data_version, conditional_get
+from .models import Comment, File, Task, TaskStatusChange, User
+from .schemas import (
+    TaskCreate,
+    TaskUpdate,
+    TaskOut,
+    TaskDetailOut,
+    CommentOut,
+    TaskStatus,
+    TaskPriority,
+)
+from .pagination import encode_cursor, decode_cursor, order_by_clauses, seek_after
+from .search import apply_search, search_condition
+from .stats import (
+    TaskContribution,
+    as_date,
+    contribution,
+    contribution_of,
+    record_change,
+    record_changes,
+    record_grouped_changes,
+)
 
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
 
+# Columns the task list can be sorted (and cursor-paginated) by
+SORTABLE_FIELDS = {
+    "created_at": Task.created_at,
+    "priority": Task.priority,
+    "status": Task.status,
+    "due_date": Task.due_date,
+    "title": Task.title,
+}
+
 
 # --------------------
 # Schemas
 # --------------------
+# Ids accepted by one bulk update/delete; each is a bound parameter, and
+# older SQLite builds allow at most 999 per statement. Larger selections
+# go through `filter`.
+MAX_BULK_IDS = 500
+
+
 class BulkTaskCreate(BaseModel):
     tasks: List[TaskCreate]
 
 
+class BulkTaskFilter(BaseModel):
+    status: Optional[TaskStatus] = None
+    priority: Optional[TaskPriority] = None
+    search: Optional[str] = None
+
+
+class BulkTaskSelection(BaseModel):
+    """Either an explicit id list or the get_tasks filter set."""
+    ids: Optional[List[int]] = Field(None, max_length=MAX_BULK_IDS)
+    filter: Optional[BulkTaskFilter] = None
+
+
+class BulkTaskUpdate(BulkTaskSelection):
+    changes: TaskUpdate
+
+
 # --------------------
 # Create Task
 # --------------------
 @router.post("/", response_model=TaskOut)
+@db_route
 def create_task(
     task: TaskCreate,
     current_user: User = Depends(get_current_user),
@@ -35,7 +93,12 @@ def create_task(
         **task.dict(),
         created_by=current_user.id,
     )
+    if db_task.status == "done":
+        db_task.created_at = db_task.completed_at = datetime.utcnow()
     db.add(db_task)
+    db.flush()
+    record_change(db, None, contribution(db_task))
+    bump_data_version(db, current_user.id)
     db.commit()
     db.refresh(db_task)
     return db_task
@@ -45,25 +108,232 @@ def create_task(
 # Bulk Create Tasks
 # --------------------
 @router.post("/bulk", response_model=List[TaskOut])
+@db_route
 def bulk_create_tasks(
     payload: BulkTaskCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
+    now = datetime.utcnow()
     db_tasks = [
-        Task(**task.dict(), created_by=current_user.id)
+        Task(
+            **task.dict(),
+            created_by=current_user.id,
+            created_at=now,
+            completed_at=now if task.status == "done" else None,
+        )
         for task in payload.tasks
     ]
     db.add_all(db_tasks)
+    db.flush()
+    record_changes(db, [(None, contribution(task)) for task in db_tasks])
+
+    # Serialize before commit expires the objects, which would
+    # otherwise reload every task with its own SELECT.
+    created = [TaskOut.model_validate(task) for task in db_tasks]
+    bump_data_version(db, current_user.id)
     db.commit()
-    return db_tasks
+    return created
+
+
+# --------------------
+# Bulk Import Tasks (streamed NDJSON / CSV)
+# --------------------
+# Rows inserted (and committed) per chunk
+IMPORT_CHUNK_SIZE = 1000
+# Per-row errors included in the summary
+IMPORT_MAX_ERRORS = 100
+
+
+@router.post("/import")
+async def import_tasks(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(csv|ndjson)$"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Imports tasks from a streamed request body: one JSON object per line
+    (ndjson) or a CSV with the export_tasks header. The body is parsed as
+    it arrives and inserted in IMPORT_CHUNK_SIZE-row executemany batches,
+    each committed on its own. Returns a summary instead of the rows.
+    """
+    body = request.stream()
+
+    async def next_chunk():
+        try:
+            return await body.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    # Parsing and inserts run in a worker thread that pulls body
+    # chunks from the event loop as it needs them.
+    return await to_thread.run_sync(
+        _import_rows, db, current_user.id, format, next_chunk
+    )
+
+
+def _import_rows(db: Session, user_id: int, format: str, next_chunk) -> dict:
+    summary = {
+        "inserted": 0,
+        "failed": 0,
+        "first_id": None,
+        "last_id": None,
+        "errors": [],
+    }
+
+    lines = _body_lines(lambda: from_thread.run(next_chunk))
+    records = csv.DictReader(lines) if format == "csv" else lines
+
+    chunk = []
+    row_number = 0
+
+    while True:
+        try:
+            record = next(records)
+        except StopIteration:
+            break
+        except csv.Error as exc:
+            # The CSV reader cannot resume after a malformed record
+            _record_error(summary, row_number + 1, str(exc))
+            break
+
+        if format == "ndjson":
+            if not record.strip():
+                continue
+            row_number += 1
+            try:
+                record = json.loads(record)
+            except ValueError as exc:
+                _record_error(summary, row_number, f"Invalid JSON: {exc}")
+                continue
+        else:
+            row_number += 1
+
+        try:
+            chunk.append(_import_values(record, user_id))
+        except (ValidationError, TypeError) as exc:
+            _record_error(summary, row_number, _error_message(exc))
+            continue
+
+        if len(chunk) == IMPORT_CHUNK_SIZE:
+            _insert_chunk(db, chunk, summary)
+            chunk = []
+
+    if chunk:
+        _insert_chunk(db, chunk, summary)
+
+    return summary
+
+
+def _body_lines(next_chunk):
+    """Decodes a byte stream into lines (line endings kept)."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+
+    while True:
+        chunk = next_chunk()
+        if chunk is None:
+            break
+
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line + "\n"
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def _import_values(record, user_id: int) -> dict:
+    if not isinstance(record, dict):
+        raise TypeError("Row must be an object")
+
+    # CSV cells are strings; empty cells mean "not set"
+    fields = {
+        key: value
+        for key, value in record.items()
+        if key in TaskCreate.model_fields and value not in ("", None)
+    }
+    task = TaskCreate(**fields)
+
+    now = datetime.utcnow()
+    values = task.model_dump(mode="python")
+    values["status"] = task.status.value
+    values["priority"] = task.priority.value
+    values.update(
+        created_by=user_id,
+        is_deleted=False,
+        created_at=now,
+        completed_at=now if task.status == "done" else None,
+    )
+    return values
+
+
+def _insert_chunk(db: Session, rows: list, summary: dict) -> None:
+    # render_nulls keeps None values in the statement: the ORM otherwise
+    # drops them and splits the batch wherever the set of NULL columns
+    # changes (e.g. completed_at for done vs open tasks).
+    ids = db.execute(
+        insert(Task).returning(Task.id),
+        rows,
+        execution_options={"render_nulls": True},
+    ).scalars().all()
+    record_changes(
+        db,
+        [
+            (
+                None,
+                contribution_of(
+                    row["created_by"],
+                    row["status"],
+                    row["priority"],
+                    row["created_at"],
+                    row["completed_at"],
+                ),
+            )
+            for row in rows
+        ],
+    )
+    bump_data_version(db, rows[0]["created_by"])
+    db.commit()
+
+    summary["inserted"] += len(ids)
+    if ids:
+        low, high = min(ids), max(ids)
+        summary["first_id"] = low if summary["first_id"] is None else min(summary["first_id"], low)
+        summary["last_id"] = high if summary["last_id"] is None else max(summary["last_id"], high)
+
+
+def _record_error(summary: dict, row_number: int, message: str) -> None:
+    summary["failed"] += 1
+    if len(summary["errors"]) < IMPORT_MAX_ERRORS:
+        summary["errors"].append({"row": row_number, "error": message})
+
+
+def _error_message(exc: Exception) -> str:
+    if isinstance(exc, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+            for error in exc.errors()
+        )
+    return str(exc)
 
 
 # --------------------
 # Get All Tasks (filter + search + sort + pagination)
 # --------------------
-@router.get("/", response_model=List[TaskOut])
+@router.get(
+    "/",
+    response_model=List[TaskDetailOut],
+    response_model_exclude_unset=True,
+    dependencies=[Depends(conditional_get(read=True))],
+)
+@db_route
 def get_tasks(
+    response: Response,
     status: Optional[str] = Query(None),
     priority: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
@@ -71,9 +341,24 @@ def get_tasks(
     order: str = Query("desc"),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    include: Optional[str] = Query(None),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
+    """
+    Two pagination modes:
+    - page/limit: classic OFFSET paging (kept for existing clients)
+    - cursor/limit: keyset paging; pass the X-Next-Cursor header of the
+      previous response to fetch the next page in constant time
+
+    With a search term, sort_by=relevance orders by full-text rank
+    (best match first for order=desc).
+
+    include= embeds related data (see INCLUDE_OPTIONS).
+    """
+    includes = parse_include(include)
+
     query = db.query(Task).filter(
         Task.is_deleted == False,
         Task.created_by == current_user.id,
@@ -84,49 +369,173 @@ def get_tasks(
         query = query.filter(Task.status == status)
     if priority:
         query = query.filter(Task.priority == priority)
+
+    rank_column = None
     if search:
-        query = query.filter(Task.title.ilike(f"%{search}%"))
+        query, rank_column = apply_search(query, search, ranked=sort_by == "relevance")
 
     # -------- Sorting  --------
-    SORTABLE_FIELDS = {
-        "created_at": Task.created_at,
-        "priority": Task.priority,
-        "status": Task.status,
-        "due_date": Task.due_date,
-        "title": Task.title,
-    }
+    descending = order == "desc"
+
+    if sort_by == "relevance":
+        if not search:
+            raise HTTPException(
+                status_code=400,
+                detail="Sorting by relevance requires a search term",
+            )
+        if rank_column is not None:
+            # bm25 scores are lower for better matches
+            sort_column = rank_column
+            descending = not descending
+            query = query.add_columns(rank_column)
+        else:
+            sort_column = Task.created_at
+    else:
+        sort_column = SORTABLE_FIELDS.get(sort_by)
+        if sort_column is None:
+            raise HTTPException(status_code=400, detail="Invalid sort field")
 
-    sort_column = SORTABLE_FIELDS.get(sort_by)
-    if not sort_column:
-        raise HTTPException(status_code=400, detail="Invalid sort field")
+    query = query.order_by(*order_by_clauses(sort_column, Task.id, descending))
 
-    if order == "desc":
-        query = query.order_by(desc(sort_column))
+    # -------- Pagination --------
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_by, order, sort_column)
+        query = query.filter(
+            seek_after(sort_column, Task.id, descending, value, last_id)
+        )
     else:
-        query = query.order_by(asc(sort_column))
+        query = query.offset((page - 1) * limit)
 
-    # -------- Pagination --------
-    return (
-        query
-        .offset((page - 1) * limit)
-        .limit(limit)
-        .all()
-    )
+    rows = query.limit(limit).all()
+
+    if sort_column is rank_column:
+        tasks = [task for task, _ in rows]
+        sort_values = [rank for _, rank in rows]
+    else:
+        tasks = rows
+        sort_values = [getattr(task, sort_column.key) for task in tasks]
+
+    # A full page means there may be more rows after it
+    if len(tasks) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            sort_by, order, sort_values[-1], tasks[-1].id
+        )
+
+    return with_includes(db, tasks, includes)
+
+
+# --------------------
+# Related data (include=)
+# --------------------
+# Options are loaded for the whole page at once: one aggregate query per
+# related table, so the query count does not depend on the page size.
+INCLUDE_OPTIONS = ("counts", "latest_comment", "assignee")
+
+
+def parse_include(include: Optional[str]) -> set:
+    """Parses a comma-separated include= value."""
+    if not include:
+        return set()
+
+    includes = {option.strip() for option in include.split(",") if option.strip()}
+    invalid = includes - set(INCLUDE_OPTIONS)
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid include option: {', '.join(sorted(invalid))}",
+        )
+    return includes
+
+
+def with_includes(db: Session, tasks: list, includes: set) -> list:
+    """
+    Returns the tasks with the requested related data attached
+    (as TaskDetailOut), or the tasks unchanged when nothing was requested.
+    """
+    if not includes or not tasks:
+        return tasks
+
+    task_ids = [task.id for task in tasks]
+    extras = {task_id: {} for task_id in task_ids}
+
+    if "counts" in includes:
+        for model, field in ((Comment, "comment_count"), (File, "file_count")):
+            counts = dict(
+                db.query(model.task_id, func.count(model.id))
+                .filter(model.task_id.in_(task_ids))
+                .group_by(model.task_id)
+            )
+            for task_id in task_ids:
+                extras[task_id][field] = counts.get(task_id, 0)
+
+    if "latest_comment" in includes:
+        latest_ids = (
+            db.query(func.max(Comment.id))
+            .filter(Comment.task_id.in_(task_ids))
+            .group_by(Comment.task_id)
+        )
+        latest = {
+            comment.task_id: CommentOut.model_validate(comment)
+            for comment in db.query(Comment).filter(Comment.id.in_(latest_ids))
+        }
+        for task_id in task_ids:
+            extras[task_id]["latest_comment"] = latest.get(task_id)
+
+    if "assignee" in includes:
+        assignee_ids = {task.assigned_to for task in tasks if task.assigned_to is not None}
+        names = dict(
+            db.query(User.id, User.name).filter(User.id.in_(assignee_ids))
+        ) if assignee_ids else {}
+        for task in tasks:
+            extras[task.id]["assignee_name"] = names.get(task.assigned_to)
+
+    return [
+        TaskDetailOut.model_validate(task).model_copy(update=extras[task.id])
+        for task in tasks
+    ]
 
 
 # --------------------
 # EXPORT TASKS
 # --------------------
+EXPORT_FIELDS = [
+    "id",
+    "title",
+    "description",
+    "status",
+    "priority",
+    "due_date",
+    "tags",
+    "assigned_to",
+    "created_at",
+]
+
+# Rows fetched from the database (and written to the response) per batch
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
 @router.get("/export")
 def export_tasks(
-    format: str = Query("csv", pattern="^(csv|json)$"),
+    format: str = Query("csv", pattern="^(csv|json|ndjson)$"),
     status: Optional[str] = Query(None),
     priority: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
+    compress: bool = Query(False, alias="gzip"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    query = db.query(Task).filter(
+    """
+    Streams the export in batches: rows are read with a server-side
+    cursor and written to the response as they arrive, so memory use
+    does not depend on the number of exported tasks.
+    """
+    query = db.query(*[getattr(Task, field) for field in EXPORT_FIELDS]).filter(
         Task.is_deleted == False,
         Task.created_by == current_user.id,
     )
@@ -136,60 +545,280 @@ def export_tasks(
     if priority:
         query = query.filter(Task.priority == priority)
     if search:
-        query = query.filter(Task.title.ilike(f"%{search}%"))
+        query, _ = apply_search(query, search)
 
-    tasks = query.all()
+    # (created_at, id) is the order of ix_tasks_live_owner_created_at, so
+    # rows stream in index order without sorting the export up front
+    query = query.order_by(Task.created_at, Task.id)
 
-    if format == "json":
-        return JSONResponse(
-            content=jsonable_encoder(tasks),
-            media_type="application/json"
-)
+    # The stream outlives the request-scoped session, so it runs
+    # on its own session which is closed once the body is sent.
+    stream_db = ReadSessionLocal()
+    chunks = _export_chunks(query.with_session(stream_db), format)
 
+    filename = f"tasks.{format}"
+    media_type = EXPORT_MEDIA_TYPES[format]
 
-    buffer = io.StringIO()
-    writer = csv.writer(buffer)
-
-    writer.writerow([
-        "id",
-        "title",
-        "description",
-        "status",
-        "priority",
-        "due_date",
-        "tags",
-        "assigned_to",
-        "created_at",
-    ])
-
-    for task in tasks:
-        writer.writerow([
-            task.id,
-            task.title,
-            task.description or "",
-            task.status,
-            task.priority,
-            task.due_date.isoformat() if task.due_date else "",
-            task.tags or "",
-            task.assigned_to or "",
-            task.created_at.isoformat(),
-        ])
-
-    buffer.seek(0)
+    if compress:
+        chunks = _gzip_chunks(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
 
     return StreamingResponse(
-        buffer,
-        media_type="text/csv; charset=utf-8",
-        headers={"Content-Disposition": "attachment; filename=tasks.csv"},
+        _closing(chunks, stream_db),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+def _export_chunks(query, format: str):
+    """
+    Yields the encoded export, one chunk per EXPORT_BATCH_SIZE rows.
+    """
+    buffer = io.StringIO()
+
+    if format == "csv":
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+    elif format == "json":
+        buffer.write("[")
+
+    for count, row in enumerate(query.yield_per(EXPORT_BATCH_SIZE), start=1):
+        if format == "csv":
+            writer.writerow([_csv_value(value) for value in row])
+        else:
+            if format == "json" and count > 1:
+                buffer.write(",")
+            buffer.write(json.dumps(dict(zip(EXPORT_FIELDS, row)), default=_json_default))
+            if format == "ndjson":
+                buffer.write("\n")
+
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    if format == "json":
+        buffer.write("]")
+
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def _closing(chunks, session):
+    try:
+        yield from chunks
+    finally:
+        session.close()
+
+
+# --------------------
+# Bulk Update / Bulk Soft Delete
+# --------------------
+# Both run as a single set-based UPDATE scoped to the current user.
+# They are declared before the /{task_id} routes so "bulk" is not
+# parsed as a task id.
+@router.patch("/bulk")
+@db_route
+def bulk_update_tasks(
+    payload: BulkTaskUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    where = _bulk_selection(payload, current_user.id)
+    changes = payload.changes.dict(exclude_unset=True)
+
+    if not changes:
+        raise HTTPException(status_code=400, detail="No changes given")
+
+    now = datetime.utcnow()
+    values = {
+        key: getattr(value, "value", value)
+        for key, value in changes.items()
+    }
+    new_status = values.get("status")
+
+    # Lock before reading the rows the stats deltas are computed from
+    lock_user_tasks(db, current_user.id)
+    before_groups = _bulk_groups(db, where)
+
+    if new_status is not None:
+        # Status history for the rows whose status actually changes
+        db.execute(
+            insert(TaskStatusChange).from_select(
+                ["task_id", "from_status", "to_status", "changed_at"],
+                db.query(Task.id, Task.status, literal(new_status), literal(now))
+                .filter(*where, Task.status != new_status)
+                .statement,
+            )
+        )
+        if new_status == "done":
+            values["completed_at"] = case(
+                (Task.status == "done", Task.completed_at),
+                else_=now,
+            )
+        else:
+            values["completed_at"] = None
+
+    updated = (
+        db.query(Task)
+        .filter(*where)
+        .update(values, synchronize_session=False)
+    )
+
+    record_grouped_changes(
+        db,
+        (
+            (before, _bulk_after(before, values, now), count)
+            for before, count in before_groups
+        ),
+    )
+    db.commit()
+
+    return {"updated": updated}
+
+
+@router.delete("/bulk")
+@db_route
+def bulk_delete_tasks(
+    payload: BulkTaskSelection,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    where = _bulk_selection(payload, current_user.id)
+
+    lock_user_tasks(db, current_user.id)
+    before_groups = _bulk_groups(db, where)
+
+    deleted = (
+        db.query(Task)
+        .filter(*where)
+        .update({"is_deleted": True}, synchronize_session=False)
+    )
+
+    record_grouped_changes(
+        db,
+        ((before, None, count) for before, count in before_groups),
+    )
+    db.commit()
+
+    return {"deleted": deleted}
+
+
+def _bulk_selection(payload: BulkTaskSelection, user_id: int) -> list:
+    if (payload.ids is None) == (payload.filter is None):
+        raise HTTPException(
+            status_code=400,
+            detail="Provide either 'ids' or 'filter'",
+        )
+
+    where = [
+        Task.created_by == user_id,
+        Task.is_deleted == False,
+    ]
+
+    if payload.ids is not None:
+        where.append(Task.id.in_(payload.ids))
+        return where
+
+    if payload.filter.status:
+        where.append(Task.status == payload.filter.status.value)
+    if payload.filter.priority:
+        where.append(Task.priority == payload.filter.priority.value)
+    if payload.filter.search:
+        where.append(search_condition(payload.filter.search))
+    return where
+
+
+def _bulk_groups(db: Session, where: list) -> list:
+    """
+    Stats contributions of the selected rows before the change,
+    grouped so the counters can be adjusted without loading every task.
+    """
+    created_day = func.date(Task.created_at)
+    completed_day = func.date(Task.completed_at)
+
+    rows = (
+        db.query(
+            Task.created_by,
+            Task.status,
+            Task.priority,
+            created_day,
+            completed_day,
+            func.count(Task.id),
+        )
+        .filter(*where)
+        .group_by(Task.created_by, Task.status, Task.priority, created_day, completed_day)
+        .all()
+    )
+
+    return [
+        (
+            TaskContribution(
+                user_id=user_id,
+                status=task_status,
+                priority=priority,
+                created_day=as_date(created),
+                completed_day=as_date(completed) if task_status == "done" and completed else None,
+            ),
+            count,
+        )
+        for user_id, task_status, priority, created, completed, count in rows
+    ]
+
+
+def _bulk_after(before: TaskContribution, values: dict, now: datetime) -> TaskContribution:
+    new_status = values.get("status", before.status)
+
+    completed_day = before.completed_day
+    if "status" in values:
+        if new_status != "done":
+            completed_day = None
+        elif before.status != "done":
+            completed_day = now.date()
+
+    return before._replace(
+        status=new_status,
+        priority=values.get("priority", before.priority),
+        completed_day=completed_day,
     )
 
 
 # --------------------
 # Get Single Task
 # --------------------
-@router.get("/{task_id}", response_model=TaskOut)
+@router.get(
+    "/{task_id}",
+    response_model=TaskDetailOut,
+    response_model_exclude_unset=True,
+    dependencies=[Depends(conditional_get())],
+)
+@db_route
 def get_task(
     task_id: int,
+    include: Optional[str] = Query(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -202,53 +831,99 @@ def get_task(
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    return task
+    return with_includes(db, [task], parse_include(include))[0]
 
 
 # --------------------
 # Update Task
 # --------------------
 @router.put("/{task_id}", response_model=TaskOut)
+@db_route
 def update_task(
     task_id: int,
     task_update: TaskUpdate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    task = db.get(Task, task_id)
+    task = locked_task(db, task_id, current_user.id)
 
-    if not task or task.is_deleted:
-        raise HTTPException(status_code=404, detail="Task not found")
-
-    if task.created_by != current_user.id:
-        raise HTTPException(status_code=403, detail="Not allowed")
+    before = contribution(task)
+    previous_status = task.status
 
     for key, value in task_update.dict(exclude_unset=True).items():
         setattr(task, key, value)
 
+    if task.status != previous_status:
+        track_status_change(db, task, previous_status)
+
+    record_change(db, before, contribution(task))
     db.commit()
     db.refresh(task)
     return task
 
 
+def lock_user_tasks(db: Session, user_id: int) -> None:
+    """
+    Starts the write transaction before the user's tasks are read, so stats
+    contributions computed from them cannot be stale. Bumping the user's
+    data version is the first write: it takes SQLite's write lock (and the
+    in-process one, see database._serialize_writes) or, on PostgreSQL, the
+    user's row lock, which every write to the user's tasks takes too.
+    """
+    bump_data_version(db, user_id)
+
+
+def locked_task(db: Session, task_id: int, user_id: int) -> Task:
+    """The user's live task, read under lock_user_tasks(); 404/403 otherwise."""
+    lock_user_tasks(db, user_id)
+    task = db.get(Task, task_id, with_for_update=True)
+
+    if not task or task.is_deleted:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    if task.created_by != user_id:
+        raise HTTPException(status_code=403, detail="Not allowed")
+
+    return task
+
+
+def track_status_change(db: Session, task: Task, previous_status: str) -> None:
+    """
+    Stamps completed_at when a task moves into "done" (and clears it when
+    it moves out) and appends the transition to the status history.
+    """
+    now = datetime.utcnow()
+
+    if task.status == "done":
+        task.completed_at = now
+    elif previous_status == "done":
+        task.completed_at = None
+
+    db.add(
+        TaskStatusChange(
+            task_id=task.id,
+            from_status=previous_status,
+            to_status=task.status,
+            changed_at=now,
+        )
+    )
+
+
 # --------------------
 # Soft Delete Task
 # --------------------
 @router.delete("/{task_id}")
+@db_route
 def delete_task(
     task_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    task = db.get(Task, task_id)
-
-    if not task or task.is_deleted:
-        raise HTTPException(status_code=404, detail="Task not found")
-
-    if task.created_by != current_user.id:
-        raise HTTPException(status_code=403, detail="Not allowed")
+    task = locked_task(db, task_id, current_user.id)
 
+    before = contribution(task)
     task.is_deleted = True
+    record_change(db, before, None)
     db.commit()
 
     return {"message": "Task deleted successfully"}
@@ -0,0 +1,204 @@
+import asyncio
+import importlib.util
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+from .config import (
+    THUMBNAIL_MAX_PENDING,
+    THUMBNAIL_RETRY_AFTER,
+    THUMBNAIL_SIZE,
+    THUMBNAIL_WORKERS,
+)
+from .instrumentation import timer
+
+logger = logging.getLogger("app.thumbnails")
+
+# =========================================================
+# THUMBNAIL POOL
+# =========================================================
+# Resizing images and rendering PDF pages is CPU-bound and holds the GIL,
+# so it runs in a small process pool instead of the request threads.
+# Uploads schedule their thumbnail once committed; GET /files/{id}/thumbnail
+# serves it, or generates it on demand when it is missing (e.g. files
+# uploaded before thumbnails existed, or a job skipped because the pool was
+# busy). Jobs for the same source are coalesced.
+#
+# Thumbnails are JPEGs of at most THUMBNAIL_SIZE px per side, stored next
+# to the original as <path>.thumb.jpg; blob thumbnails are therefore shared
+# by every file with the same content and removed by gc with their blob.
+# PDF previews (first page) need PyMuPDF (`pip install pymupdf`); without
+# it PDFs simply have no thumbnail.
+#
+# A worker that dies (e.g. killed for memory on a huge PDF) breaks the
+# whole ProcessPoolExecutor; the pool is then discarded and rebuilt on the
+# next submission instead of failing every later thumbnail.
+
+THUMBNAIL_SUFFIX = ".thumb.jpg"
+THUMBNAIL_MEDIA_TYPE = "image/jpeg"
+
+HAS_PYMUPDF = importlib.util.find_spec("fitz") is not None
+
+_executor: Optional[ProcessPoolExecutor] = None
+# target path -> future of the job writing it
+_jobs: dict = {}
+_jobs_lock = threading.Lock()
+
+
+def thumbnail_path(path: str) -> str:
+    return path + THUMBNAIL_SUFFIX
+
+
+def can_render(content_type: Optional[str]) -> bool:
+    if content_type in ("image/png", "image/jpeg"):
+        return True
+    return content_type == "application/pdf" and HAS_PYMUPDF
+
+
+def pending_jobs() -> int:
+    return len(_jobs)
+
+
+def schedule_thumbnail(path: str, content_type: Optional[str]) -> None:
+    """
+    Queues a thumbnail for a stored upload unless it already exists.
+    Best effort: skipped when the pool is full or failing (it is then
+    generated on first request). Never raises, as uploads call it after
+    committing.
+    """
+    target = thumbnail_path(path)
+    try:
+        if not can_render(content_type) or os.path.exists(target):
+            return
+        _submit(path, target, content_type)
+    except Exception:
+        logger.exception("Could not schedule thumbnail for %s", path)
+
+
+async def ensure_thumbnail(path: str, content_type: Optional[str]) -> Optional[str]:
+    """
+    Path of the file's thumbnail, generated now if missing; None if the
+    file type has no thumbnail. 503 when the pool queue is full.
+    """
+    target = thumbnail_path(path)
+    if os.path.exists(target):
+        return target
+    if not can_render(content_type):
+        return None
+
+    future = _submit(path, target, content_type)
+    if future is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Thumbnail service busy, please retry",
+            headers={"Retry-After": str(THUMBNAIL_RETRY_AFTER)},
+        )
+
+    try:
+        with timer("thumbnail"):
+            rendered = await asyncio.wrap_future(future)
+    except Exception:
+        # Unreadable source (logged by _finished)
+        return None
+    return target if rendered else None
+
+
+def _submit(path: str, target: str, content_type: str) -> Optional[Future]:
+    with _jobs_lock:
+        future = _jobs.get(target)
+        if future is not None:
+            return future
+        if len(_jobs) >= THUMBNAIL_MAX_PENDING:
+            return None
+
+        try:
+            future = _pool().submit(render_thumbnail, path, target, content_type, THUMBNAIL_SIZE)
+        except BrokenProcessPool:
+            logger.warning("Thumbnail pool broken (worker died), restarting it")
+            _reset_pool()
+            future = _pool().submit(render_thumbnail, path, target, content_type, THUMBNAIL_SIZE)
+        _jobs[target] = future
+
+    future.add_done_callback(lambda done: _finished(target, done))
+    return future
+
+
+def _pool() -> ProcessPoolExecutor:
+    """The worker pool, created on first use. Call with _jobs_lock held."""
+    global _executor
+
+    if _executor is None:
+        # spawn: workers must not inherit the server's threads and
+        # database connections
+        _executor = ProcessPoolExecutor(
+            max_workers=THUMBNAIL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def _reset_pool() -> None:
+    """
+    Drops a broken pool and its jobs (which have failed with it).
+    Call with _jobs_lock held.
+    """
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    _jobs.clear()
+
+
+def _finished(target: str, future: Future) -> None:
+    with _jobs_lock:
+        # The job may have been dropped with a broken pool and resubmitted
+        if _jobs.get(target) is future:
+            del _jobs[target]
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning("Thumbnail for %s failed: %r", target, future.exception())
+
+
+# -------------------- Worker process --------------------
+def render_thumbnail(source: str, target: str, content_type: str, size: int) -> bool:
+    """
+    Writes a JPEG thumbnail of `source` to `target` (atomically).
+    Returns False when the source cannot be rendered.
+    """
+    from PIL import Image
+
+    if content_type == "application/pdf":
+        import fitz
+
+        with fitz.open(source) as document:
+            if document.page_count == 0:
+                return False
+            page = document[0]
+            zoom = size / max(page.rect.width, page.rect.height)
+            pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            image = Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+    else:
+        image = Image.open(source)
+        # Lets the JPEG decoder downscale while decoding
+        image.draft("RGB", (size, size))
+
+    image.thumbnail((size, size))
+    if image.mode in ("RGBA", "LA", "P"):
+        # Flatten transparency onto white
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+
+    temp = f"{target}.{os.getpid()}.part"
+    image.save(temp, "JPEG", quality=80, optimize=True)
+    os.replace(temp, target)
+    return True
@@ -0,0 +1,14 @@
+"""
+API benchmark suite.
+
+Seeds a synthetic dataset and drives the real FastAPI app in-process
+through an ASGI client:
+
+    python -m benchmarks run --tasks 100000 --output results/main.json
+    python -m benchmarks run --tasks 100000 --baseline results/main.json
+    python -m benchmarks compare results/main.json results/branch.json
+
+Run from the backend directory. Application settings (ASYNC_DB,
+SQLITE_PROFILE, DATABASE_URL pool settings, ...) are read from the
+environment as usual and recorded in the results.
+"""
@@ -0,0 +1,198 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="API benchmark suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Seed (if needed) and run scenarios")
+    run.add_argument("--users", type=int, default=1, help="Seeded users (tasks are spread across them)")
+    run.add_argument("--tasks", type=int, default=10_000, help="Seeded tasks in total")
+    run.add_argument("--comments", type=float, default=2.0, help="Average comments per task")
+    run.add_argument("--files", type=float, default=0.2, help="Average file records per task")
+    run.add_argument("--scenarios", default="all", help="Comma-separated scenario names or 'all'")
+    run.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    run.add_argument("--concurrency", type=int, default=10, help="Concurrent callers")
+    run.add_argument("--no-analytics-cache", action="store_true", help="Disable the analytics result cache")
+    run.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="Seeded databases and uploads")
+    run.add_argument("--reseed", action="store_true", help="Rebuild the seeded database")
+    run.add_argument("--output", help="Write results to this JSON file")
+    run.add_argument("--baseline", help="Compare with this results file (exit 1 on regression)")
+    run.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+
+    compare = commands.add_parser("compare", help="Compare two results files")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        from .compare import main as compare_main
+        return compare_main(args.baseline, args.current, args.threshold)
+
+    return run_benchmarks(args)
+
+
+def run_benchmarks(args) -> int:
+    data_dir = os.path.abspath(args.data_dir)
+    os.makedirs(data_dir, exist_ok=True)
+
+    template = os.path.join(
+        data_dir, f"seed-u{args.users}-t{args.tasks}-c{args.comments}-f{args.files}.db"
+    )
+    database = os.path.join(data_dir, "run.db")
+
+    # Every run starts from a fresh copy of the seeded database, so write
+    # scenarios of earlier runs never skew the next one.
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(database + suffix):
+            os.remove(database + suffix)
+    if args.reseed and os.path.exists(template):
+        os.remove(template)
+    seeded = os.path.exists(template)
+    if seeded:
+        shutil.copyfile(template, database)
+
+    # The app reads its configuration at import time
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+    os.environ.pop("DATABASE_READ_URL", None)
+    if args.no_analytics_cache:
+        os.environ["ANALYTICS_CACHE_TTL_SECONDS"] = "0"
+    # Uploads are written relative to the working directory
+    os.chdir(data_dir)
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from app.database import engine
+
+    if not seeded:
+        import app.main  # noqa: F401  (creates the schema)
+        from .seed import seed
+
+        started = time.perf_counter()
+        print(f"Seeding {args.tasks} tasks for {args.users} users...", flush=True)
+        seed(engine, args.users, args.tasks, args.comments, args.files)
+        print(f"Seeded in {time.perf_counter() - started:.1f}s", flush=True)
+        engine.dispose()
+        shutil.copyfile(database, template)
+
+    from .scenarios import SCENARIOS
+
+    names = list(SCENARIOS) if args.scenarios == "all" else args.scenarios.split(",")
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(unknown)} (available: {', '.join(SCENARIOS)})")
+        return 2
+    # Read-only scenarios first, see scenarios.py
+    names.sort(key=lambda name: SCENARIOS[name][1])
+
+    results = asyncio.run(_run_scenarios(args, names))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        from .compare import compare, load, print_table
+
+        rows, regressions = compare(load(args.baseline), results, args.threshold)
+        print()
+        print_table(rows)
+        if regressions:
+            print(f"\n{len(regressions)} metrics regressed by more than {args.threshold}%")
+            return 1
+
+    return 0
+
+
+async def _run_scenarios(args, names: list) -> dict:
+    import httpx
+
+    from app import config
+    from app.main import app
+    from app.models import Task, User
+    from app.database import SessionLocal
+    from .scenarios import SCENARIOS, BenchContext
+    from .seed import BENCH_PASSWORD, bench_email
+
+    with SessionLocal() as db:
+        user_id = db.query(User.id).filter(User.email == bench_email(1)).scalar()
+        task_ids = [
+            task_id for (task_id,) in
+            db.query(Task.id).filter(Task.created_by == user_id, Task.is_deleted == False)
+        ]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        response = await client.post(
+            "/auth/login",
+            data={"username": bench_email(1), "password": BENCH_PASSWORD},
+        )
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        ctx = BenchContext(client, headers, task_ids, args.requests, args.concurrency)
+
+        results = {}
+        for name in names:
+            print(f"Running {name}...", flush=True)
+            fn, _ = SCENARIOS[name]
+            results[name] = await fn(ctx)
+            result = results[name]
+            print(
+                f"  {result['throughput_rps']} req/s  p50 {result['p50_ms']} ms  "
+                f"p95 {result['p95_ms']} ms  p99 {result['p99_ms']} ms  "
+                f"queries/req {result['queries_per_request']}  errors {result['errors']}",
+                flush=True,
+            )
+
+    return {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scale": {
+                "users": args.users,
+                "tasks": args.tasks,
+                "tasks_per_user": len(task_ids),
+                "comments_per_task": args.comments,
+                "files_per_task": args.files,
+            },
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "config": {
+                name: getattr(config, name)
+                for name in dir(config)
+                if name.isupper() and "URL" not in name
+            },
+        },
+        "scenarios": results,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
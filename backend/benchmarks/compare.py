@@ -0,0 +1,62 @@
+import json
+
+# Metrics compared between runs: (key, higher is better)
+COMPARED_METRICS = (
+    ("throughput_rps", True),
+    ("p50_ms", False),
+    ("p95_ms", False),
+    ("p99_ms", False),
+    ("queries_per_request", False),
+    ("peak_rss_mb", False),
+)
+
+
+def load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> tuple[list, list]:
+    """
+    Returns (table rows, regressions). A regression is a metric that got
+    worse by more than `threshold` percent.
+    """
+    rows = []
+    regressions = []
+
+    for name, result in current["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            continue
+
+        for key, higher_is_better in COMPARED_METRICS:
+            before, after = base.get(key), result.get(key)
+            if before is None or after is None:
+                continue
+
+            change = (after - before) / before * 100 if before else 0.0
+            worse = -change if higher_is_better else change
+            flag = "REGRESSION" if worse > threshold else ""
+            rows.append((name, key, before, after, change, flag))
+            if flag:
+                regressions.append(f"{name}.{key}: {before} -> {after} ({change:+.1f}%)")
+
+    return rows, regressions
+
+
+def print_table(rows: list) -> None:
+    print(f"{'scenario':<18} {'metric':<20} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, key, before, after, change, flag in rows:
+        print(f"{name:<18} {key:<20} {before:>12} {after:>12} {change:>+8.1f}% {flag}")
+
+
+def main(baseline_path: str, current_path: str, threshold: float) -> int:
+    rows, regressions = compare(load(baseline_path), load(current_path), threshold)
+    print_table(rows)
+
+    if regressions:
+        print(f"\n{len(regressions)} metrics regressed by more than {threshold}%:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    return 0
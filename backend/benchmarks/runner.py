@@ -0,0 +1,120 @@
+import asyncio
+import re
+import statistics
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Statement count reported by the app's Server-Timing header (instrumentation.py)
+QUERY_COUNT = re.compile(r'desc="(\d+) queries"')
+
+
+class Samples:
+    """Latencies, errors and per-request query counts of one load phase."""
+
+    def __init__(self):
+        self.latencies = []
+        self.queries = []
+        self.errors = 0
+        self.status_codes = {}
+        self.bytes = 0
+        self.elapsed = 0.0
+
+    def record(self, response, latency: float) -> None:
+        self.latencies.append(latency)
+        self.bytes += len(response.content)
+        self.status_codes[response.status_code] = self.status_codes.get(response.status_code, 0) + 1
+        if response.status_code >= 400:
+            self.errors += 1
+
+        match = QUERY_COUNT.search(response.headers.get("server-timing", ""))
+        if match:
+            self.queries.append(int(match.group(1)))
+
+    def summary(self) -> dict:
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "status_codes": {str(code): n for code, n in sorted(self.status_codes.items())},
+            "duration_s": round(self.elapsed, 3),
+            "throughput_rps": round(count / self.elapsed, 2) if self.elapsed else 0.0,
+            "mean_ms": _ms(statistics.fmean(latencies)) if count else None,
+            "p50_ms": _ms(_percentile(latencies, 50)),
+            "p95_ms": _ms(_percentile(latencies, 95)),
+            "p99_ms": _ms(_percentile(latencies, 99)),
+            "max_ms": _ms(latencies[-1]) if count else None,
+            "queries_per_request": round(statistics.fmean(self.queries), 2) if self.queries else None,
+            "response_bytes": self.bytes,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+
+async def run_load(client, make_request, requests: int, concurrency: int) -> Samples:
+    """
+    Sends `requests` requests with `concurrency` concurrent callers.
+    make_request(client, n) performs request number n and returns the response.
+    """
+    samples = Samples()
+    numbers = iter(range(requests))
+
+    async def caller():
+        for number in numbers:
+            started = time.perf_counter()
+            try:
+                response = await make_request(client, number)
+            except Exception:
+                samples.errors += 1
+                continue
+            samples.record(response, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    samples.elapsed = time.perf_counter() - started
+    return samples
+
+
+async def run_for(client, make_request, stop: asyncio.Event, concurrency: int) -> Samples:
+    """Like run_load(), but keeps sending requests until `stop` is set."""
+    samples = Samples()
+    counter = iter(range(10**12))
+
+    async def caller():
+        while not stop.is_set():
+            number = next(counter)
+            started = time.perf_counter()
+            try:
+                response = await make_request(client, number)
+            except Exception:
+                samples.errors += 1
+                continue
+            samples.record(response, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    samples.elapsed = time.perf_counter() - started
+    return samples
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (MiB)."""
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _percentile(values: list, percent: int):
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
@@ -0,0 +1,264 @@
+import asyncio
+import json
+
+from .runner import run_for, run_load
+from .seed import BENCH_PASSWORD, PRIORITIES, STATUSES, WORDS, bench_email
+
+# =========================================================
+# SCENARIOS
+# =========================================================
+# Each scenario drives one area of the API and returns its measurements.
+# Scenarios that write (bulk_create, import, upload, mixed_rw) run after the
+# read-only ones so they do not change the data the reads are measured on.
+
+SCENARIOS = {}
+
+# Rows per POST /tasks/bulk request and per import body
+BULK_CREATE_SIZE = 100
+IMPORT_ROWS = 10_000
+
+# 64 KiB PNG-signed payload for upload requests
+UPLOAD_BODY = b"\x89PNG\r\n\x1a\n" + bytes(64 * 1024 - 8)
+
+
+class BenchContext:
+    def __init__(self, client, headers: dict, task_ids: list, requests: int, concurrency: int):
+        self.client = client
+        self.headers = headers
+        self.task_ids = task_ids
+        self.requests = requests
+        self.concurrency = concurrency
+
+    def task_id(self, number: int) -> int:
+        return self.task_ids[number % len(self.task_ids)]
+
+
+def scenario(name: str, writes: bool = False):
+    def register(fn):
+        SCENARIOS[name] = (fn, writes)
+        return fn
+    return register
+
+
+async def _load(ctx: BenchContext, make_request, requests=None, concurrency=None) -> dict:
+    samples = await run_load(
+        ctx.client,
+        make_request,
+        requests or ctx.requests,
+        concurrency or ctx.concurrency,
+    )
+    return samples.summary()
+
+
+# -------------------- Task lists --------------------
+@scenario("list")
+async def list_tasks(ctx: BenchContext) -> dict:
+    async def request(client, number):
+        return await client.get("/tasks/", params={"limit": 20}, headers=ctx.headers)
+    return await _load(ctx, request)
+
+
+@scenario("list_filter_sort")
+async def list_filter_sort(ctx: BenchContext) -> dict:
+    sorts = ("created_at", "due_date", "title", "priority", "status")
+
+    async def request(client, number):
+        params = {
+            "status": STATUSES[number % len(STATUSES)],
+            "priority": PRIORITIES[number % len(PRIORITIES)],
+            "sort_by": sorts[number % len(sorts)],
+            "order": "asc" if number % 2 else "desc",
+            "page": number % 20 + 1,
+            "limit": 20,
+        }
+        return await client.get("/tasks/", params=params, headers=ctx.headers)
+    return await _load(ctx, request)
+
+
+@scenario("list_deep_page")
+async def list_deep_page(ctx: BenchContext) -> dict:
+    """OFFSET paging far into the list (compare with list_cursor)."""
+    page = max(len(ctx.task_ids) // 40, 1)
+
+    async def request(client, number):
+        return await client.get("/tasks/", params={"page": page, "limit": 20}, headers=ctx.headers)
+    return await _load(ctx, request)
+
+
+@scenario("list_cursor")
+async def list_cursor(ctx: BenchContext) -> dict:
+    """Walks the list with keyset cursors, one chain per caller."""
+    cursors = {}
+
+    async def request(client, number):
+        chain = number % ctx.concurrency
+        params = {"limit": 20}
+        if cursors.get(chain):
+            params["cursor"] = cursors[chain]
+        response = await client.get("/tasks/", params=params, headers=ctx.headers)
+        cursors[chain] = response.headers.get("x-next-cursor")
+        return response
+    return await _load(ctx, request)
+
+
+@scenario("search")
+async def search(ctx: BenchContext) -> dict:
+    async def request(client, number):
+        term = WORDS[number % len(WORDS)]
+        params = {"search": term, "sort_by": "relevance", "limit": 20}
+        return await client.get("/tasks/", params=params, headers=ctx.headers)
+    return await _load(ctx, request)
+
+
+@scenario("task_detail")
+async def task_detail(ctx: BenchContext) -> dict:
+    async def request(client, number):
+        return await client.get(
+            f"/tasks/{ctx.task_id(number)}",
+            params={"include": "counts,latest_comment,assignee"},
+            headers=ctx.headers,
+        )
+    return await _load(ctx, request)
+
+
+# -------------------- Export --------------------
+@scenario("export")
+async def export(ctx: BenchContext) -> dict:
+    formats = ("csv", "ndjson")
+
+    async def request(client, number):
+        return await client.get(
+            "/tasks/export",
+            params={"format": formats[number % len(formats)]},
+            headers=ctx.headers,
+        )
+
+    result = await _load(ctx, request, requests=max(ctx.requests // 50, 4), concurrency=2)
+    if result["duration_s"]:
+        result["export_mb_per_s"] = round(result["response_bytes"] / 2**20 / result["duration_s"], 2)
+    return result
+
+
+# -------------------- Analytics --------------------
+@scenario("analytics")
+async def analytics(ctx: BenchContext) -> dict:
+    paths = (
+        "/analytics/summary",
+        "/analytics/overview",
+        "/analytics/user-performance",
+        "/analytics/trends",
+        "/analytics/completion-trends",
+        "/analytics/cycle-time",
+    )
+
+    async def request(client, number):
+        return await client.get(paths[number % len(paths)], headers=ctx.headers)
+    return await _load(ctx, request)
+
+
+# -------------------- Auth --------------------
+@scenario("login_storm")
+async def login_storm(ctx: BenchContext) -> dict:
+    """
+    Task-read latency on its own, then while logins hammer the password
+    hashing pool. Read p99 should stay close to the baseline.
+    """
+    async def read(client, number):
+        return await client.get("/tasks/", params={"limit": 20}, headers=ctx.headers)
+
+    async def login(client, number):
+        return await client.post(
+            "/auth/login",
+            data={"username": bench_email(1), "password": BENCH_PASSWORD},
+        )
+
+    baseline = (await run_load(ctx.client, read, ctx.requests, ctx.concurrency)).summary()
+
+    stop = asyncio.Event()
+    storm = asyncio.create_task(run_for(ctx.client, login, stop, ctx.concurrency * 2))
+    during = (await run_load(ctx.client, read, ctx.requests, ctx.concurrency)).summary()
+    stop.set()
+    logins = (await storm).summary()
+
+    return {
+        **during,
+        "read_p99_baseline_ms": baseline["p99_ms"],
+        "read_p99_during_storm_ms": during["p99_ms"],
+        "logins": logins["requests"],
+        "login_status_codes": logins["status_codes"],
+        "login_p50_ms": logins["p50_ms"],
+    }
+
+
+# -------------------- Writes --------------------
+@scenario("bulk_create", writes=True)
+async def bulk_create(ctx: BenchContext) -> dict:
+    async def request(client, number):
+        payload = {"tasks": [
+            {"title": f"bulk {number} {i}", "priority": PRIORITIES[i % len(PRIORITIES)]}
+            for i in range(BULK_CREATE_SIZE)
+        ]}
+        return await client.post("/tasks/bulk", json=payload, headers=ctx.headers)
+
+    result = await _load(ctx, request, requests=max(ctx.requests // 10, 5))
+    result["tasks_per_s"] = round(result["requests"] * BULK_CREATE_SIZE / result["duration_s"], 1)
+    return result
+
+
+@scenario("import", writes=True)
+async def import_tasks(ctx: BenchContext) -> dict:
+    body = "".join(
+        json.dumps({
+            "title": f"imported {i}",
+            "status": STATUSES[i % len(STATUSES)],
+            "priority": PRIORITIES[i % len(PRIORITIES)],
+            "tags": WORDS[i % len(WORDS)],
+        }) + "\n"
+        for i in range(IMPORT_ROWS)
+    ).encode("utf-8")
+
+    async def request(client, number):
+        return await client.post(
+            "/tasks/import",
+            params={"format": "ndjson"},
+            content=body,
+            headers={**ctx.headers, "Content-Type": "application/x-ndjson"},
+        )
+
+    result = await _load(ctx, request, requests=3, concurrency=1)
+    result["rows_per_s"] = round(result["requests"] * IMPORT_ROWS / result["duration_s"], 1)
+    return result
+
+
+@scenario("upload", writes=True)
+async def upload(ctx: BenchContext) -> dict:
+    async def request(client, number):
+        return await client.post(
+            f"/files/task/{ctx.task_id(number)}",
+            files={"upload": (f"bench-{number}.png", UPLOAD_BODY, "image/png")},
+            headers=ctx.headers,
+        )
+
+    result = await _load(ctx, request, requests=max(ctx.requests // 4, 10))
+    result["upload_mb_per_s"] = round(
+        result["requests"] * len(UPLOAD_BODY) / 2**20 / result["duration_s"], 2
+    )
+    return result
+
+
+@scenario("mixed_rw", writes=True)
+async def mixed_rw(ctx: BenchContext) -> dict:
+    """
+    80% list reads / 20% task updates from concurrent callers; run with
+    different SQLITE_PROFILE / SQLITE_SERIALIZE_WRITES settings to compare
+    write contention handling (errors count "database is locked" failures).
+    """
+    async def request(client, number):
+        if number % 5 == 0:
+            return await client.put(
+                f"/tasks/{ctx.task_id(number)}",
+                json={"status": STATUSES[number % len(STATUSES)]},
+                headers=ctx.headers,
+            )
+        return await client.get("/tasks/", params={"limit": 20}, headers=ctx.headers)
+    return await _load(ctx, request)
@@ -0,0 +1,132 @@
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.hashing import pwd
+from app.models import Comment, File, Task, User
+from app.stats import rebuild_stats
+
+# =========================================================
+# SYNTHETIC DATASET
+# =========================================================
+# Deterministic for a given seed, so two runs at the same scale query
+# identical data. Rows are written with chunked Core inserts; the FTS
+# triggers index tasks as they go and the stats tables are rebuilt at the end.
+#
+# Imports the app: only import this module once the benchmark database
+# has been configured (see __main__.py).
+
+BENCH_PASSWORD = "benchmark-password"
+INSERT_CHUNK_SIZE = 10_000
+
+WORDS = (
+    "alpha api audit backend billing bug cache cleanup client config cron "
+    "dashboard database deploy design docs email export feature fix frontend "
+    "index invoice login metrics migration mobile onboarding payment "
+    "performance query refactor release report review search security "
+    "signup staging storage sync test upload webhook"
+).split()
+
+STATUSES = ("todo", "in_progress", "done")
+PRIORITIES = ("low", "medium", "high")
+
+
+def bench_email(user_number: int) -> str:
+    return f"bench{user_number}@example.com"
+
+
+def seed(
+    engine,
+    users: int,
+    tasks: int,
+    comments_per_task: float,
+    files_per_task: float,
+    seed_value: int = 42,
+) -> None:
+    """
+    Creates `users` users and `tasks` tasks spread evenly across them,
+    with on average `comments_per_task` comments and `files_per_task`
+    file records per task.
+    """
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+    password = pwd.hash(BENCH_PASSWORD.encode("utf-8"))
+
+    with Session(engine) as db:
+        user_ids = [
+            db.execute(
+                insert(User).values(
+                    name=f"Bench User {number}",
+                    email=bench_email(number),
+                    password=password,
+                    data_version=0,
+                ).returning(User.id)
+            ).scalar_one()
+            for number in range(1, users + 1)
+        ]
+        db.commit()
+
+        task_rows = []
+        for number in range(tasks):
+            created_at = now - timedelta(minutes=rng.randrange(365 * 24 * 60))
+            task_status = rng.choice(STATUSES)
+            task_rows.append({
+                "title": " ".join(rng.sample(WORDS, 3)),
+                "description": " ".join(rng.choices(WORDS, k=12)),
+                "status": task_status,
+                "priority": rng.choice(PRIORITIES),
+                "due_date": created_at + timedelta(days=rng.randrange(-5, 60)) if rng.random() < 0.7 else None,
+                "tags": ",".join(rng.sample(WORDS, 2)),
+                "assigned_to": rng.choice(user_ids) if rng.random() < 0.5 else None,
+                "created_by": user_ids[number % users],
+                "created_at": created_at,
+                "completed_at": created_at + timedelta(hours=rng.randrange(1, 24 * 14)) if task_status == "done" else None,
+                "is_deleted": False,
+            })
+            if len(task_rows) == INSERT_CHUNK_SIZE:
+                _insert_tasks(db, task_rows, comments_per_task, files_per_task, rng)
+                task_rows = []
+        if task_rows:
+            _insert_tasks(db, task_rows, comments_per_task, files_per_task, rng)
+
+        rebuild_stats(db)
+        db.commit()
+
+
+def _insert_tasks(db: Session, rows: list, comments_per_task: float, files_per_task: float, rng) -> None:
+    ids = db.execute(
+        insert(Task).returning(Task.id, Task.created_by, sort_by_parameter_order=True),
+        rows,
+        execution_options={"render_nulls": True},
+    ).all()
+
+    comments = []
+    files = []
+    for (task_id, owner), row in zip(ids, rows):
+        for _ in range(_count(comments_per_task, rng)):
+            comments.append({
+                "content": " ".join(rng.choices(WORDS, k=8)),
+                "task_id": task_id,
+                "user_id": owner,
+                "created_at": row["created_at"] + timedelta(hours=rng.randrange(1, 500)),
+            })
+        for number in range(_count(files_per_task, rng)):
+            files.append({
+                "filename": f"attachment-{task_id}-{number}.pdf",
+                "path": f"uploads/attachment-{task_id}-{number}.pdf",
+                "task_id": task_id,
+            })
+
+    if comments:
+        db.execute(insert(Comment), comments)
+    if files:
+        db.execute(insert(File), files)
+    db.commit()
+
+
+def _count(average: float, rng: random.Random) -> int:
+    """Integer count with the given average."""
+    whole = int(average)
+    return whole + (1 if rng.random() < average - whole else 0)
@@ -0,0 +1,119 @@
+import os
+import re
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+
+# The app reads its configuration at import time: point it at a throwaway
+# SQLite database before anything imports app.*
+_DATA_DIR = tempfile.mkdtemp(prefix="taskflow-tests-")
+# Uploads are stored relative to the working directory
+os.chdir(_DATA_DIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DATA_DIR, 'tasks.db')}"
+os.environ.pop("DATABASE_READ_URL", None)
+# Sync handlers by default; `ASYNC_DB=1 pytest` runs the suite on AsyncSession
+os.environ.setdefault("ASYNC_DB", "0")
+# Analytics endpoints must run their queries on every request
+os.environ["ANALYTICS_CACHE_TTL_SECONDS"] = "0"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.database import async_engine, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from benchmarks.seed import BENCH_PASSWORD, bench_email, seed  # noqa: E402
+
+# Two users so the owner filter is selective, as in production
+SEED_USERS = 2
+SEED_TASKS = 4000
+
+# Engines whose statements are captured (the async one runs ASYNC_DB routes)
+ENGINES = [engine] + ([async_engine.sync_engine] if async_engine is not None else [])
+
+# Plan lines that mean a query reads every task or sorts its result
+FULL_SCAN = re.compile(r"\bSCAN tasks\b")
+TEMP_SORT = re.compile(r"TEMP B-TREE")
+
+
+def pytest_sessionfinish(session, exitstatus):
+    from app import thumbnails
+
+    # Let queued thumbnail jobs finish before their files are removed
+    if thumbnails._executor is not None:
+        thumbnails._executor.shutdown(wait=True)
+    engine.dispose()
+    shutil.rmtree(_DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def client():
+    seed(engine, SEED_USERS, SEED_TASKS, comments_per_task=1.0, files_per_task=0.2)
+    return TestClient(app)
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    response = client.post(
+        "/auth/login",
+        data={"username": bench_email(1), "password": BENCH_PASSWORD},
+    )
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+class StatementLog:
+    """SQL statements run inside capture_statements(), with SQLite plans."""
+
+    def __init__(self, explain: bool):
+        self.explain = explain
+        self.statements = []
+        # (statement, [plan detail lines]) for SELECTs
+        self.plans = []
+
+    def __len__(self):
+        return len(self.statements)
+
+    def record(self, conn, statement, parameters, executemany) -> None:
+        self.statements.append(statement)
+        if not self.explain or executemany or statement.lstrip()[:6].upper() != "SELECT":
+            return
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+            self.plans.append((statement, [row[3] for row in cursor.fetchall()]))
+        finally:
+            cursor.close()
+
+    def plan_problems(self, table: str = "tasks") -> list:
+        """Plan lines that scan `table` or sort with a temp B-tree."""
+        problems = []
+        for statement, plan in self.plans:
+            if not re.search(rf"\b{table}\b", statement):
+                continue
+            for line in plan:
+                if FULL_SCAN.search(line) or TEMP_SORT.search(line):
+                    problems.append(f"{line}\n    in: {' '.join(statement.split())}")
+        return problems
+
+
+@pytest.fixture
+def capture_statements():
+    @contextmanager
+    def capture(explain: bool = False):
+        from sqlalchemy import event
+
+        log = StatementLog(explain)
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            log.record(conn, statement, parameters, executemany)
+
+        for target in ENGINES:
+            event.listen(target, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield log
+        finally:
+            for target in ENGINES:
+                event.remove(target, "before_cursor_execute", before_cursor_execute)
+
+    return capture
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy.util.concurrency import await_only, greenlet_spawn
+
+from app import analytics
+from app.analytics_cache import AnalyticsCache, MemoryBackend
+from app.conditional import bump_data_version
+from app.database import SessionLocal
+
+# =========================================================
+# ANALYTICS RESULT CACHE
+# =========================================================
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """An enabled in-memory cache in place of the (disabled) app one."""
+    cache = AnalyticsCache(MemoryBackend(100, 60), 60)
+    monkeypatch.setattr(analytics, "analytics_cache", cache)
+    return cache
+
+
+def bump_in_other_worker(user_id):
+    """A write committed by another process: only the database knows."""
+    db = SessionLocal()
+    try:
+        bump_data_version(db, user_id)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_results_are_cached_per_data_version(client, auth_headers, cache):
+    user_id = client.get("/auth/me", headers=auth_headers).json()["id"]
+
+    first = client.get("/analytics/summary", headers=auth_headers)
+    second = client.get("/analytics/summary", headers=auth_headers)
+    assert first.json() == second.json()
+    assert (cache.misses, cache.hits) == (1, 1)
+
+    bump_in_other_worker(user_id)
+
+    client.get("/analytics/summary", headers=auth_headers)
+    assert (cache.misses, cache.hits) == (2, 1)
+
+
+def test_counters_are_exact_under_concurrency():
+    cache = AnalyticsCache(MemoryBackend(100, 60), 60)
+    calls = 400
+    barrier = threading.Barrier(8)
+
+    def lookup(i):
+        if i < 8:
+            barrier.wait()
+        return cache.get_or_compute(1, 0, "summary", {"n": i % 4}, lambda: {"n": i % 4})
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lookup, range(calls)))
+
+    stats = cache.stats()
+    assert stats["hits"] + stats["misses"] + stats["coalesced"] == calls
+
+
+def test_misses_coalesce_on_the_event_loop():
+    # ASYNC_DB routes run synchronously inside AsyncSession.run_sync()
+    # greenlets on the event loop; compute() yields to it on every query
+    cache = AnalyticsCache(MemoryBackend(100, 60), 60)
+    computed = []
+
+    def compute():
+        computed.append(1)
+        await_only(asyncio.sleep(0.05))
+        return {"total": 1}
+
+    async def lookups():
+        return await asyncio.gather(*(
+            greenlet_spawn(cache.get_or_compute, 1, 0, "summary", {}, compute)
+            for _ in range(8)
+        ))
+
+    assert asyncio.run(lookups()) == [{"total": 1}] * 8
+    assert len(computed) == 1
+    assert (cache.stats()["misses"], cache.stats()["coalesced"]) == (1, 7)
+
+
+def test_failed_computation_lets_waiters_compute_on_the_event_loop():
+    cache = AnalyticsCache(MemoryBackend(100, 60), 60)
+    attempts = []
+
+    def compute():
+        attempts.append(1)
+        await_only(asyncio.sleep(0.05))
+        if len(attempts) == 1:
+            raise RuntimeError("database went away")
+        return {"total": 1}
+
+    async def lookups():
+        return await asyncio.gather(*(
+            greenlet_spawn(cache.get_or_compute, 1, 0, "summary", {}, compute)
+            for _ in range(3)
+        ), return_exceptions=True)
+
+    results = asyncio.run(lookups())
+    assert isinstance(results[0], RuntimeError)
+    assert results[1:] == [{"total": 1}] * 2
@@ -0,0 +1,50 @@
+import io
+
+from PIL import Image
+
+from app.database import SessionLocal
+from app.models import File
+
+# =========================================================
+# CONDITIONAL REQUESTS ON ATTACHMENTS
+# =========================================================
+
+
+def png_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), "green").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def upload(client, auth_headers):
+    task = client.post("/tasks/", json={"title": "Attachment"}, headers=auth_headers).json()
+    response = client.post(
+        f"/files/task/{task['id']}",
+        files={"upload": ("image.png", png_bytes(), "image/png")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def test_download_revalidates_with_etag(client, auth_headers):
+    file_id = upload(client, auth_headers)
+
+    etag = client.get(f"/files/{file_id}", headers=auth_headers).headers["ETag"]
+    response = client.get(f"/files/{file_id}", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_file_without_hash_ignores_if_none_match(client, auth_headers):
+    file_id = upload(client, auth_headers)
+
+    # As stored before content hashes were recorded: no ETag
+    db = SessionLocal()
+    try:
+        db.get(File, file_id).sha256 = None
+        db.commit()
+    finally:
+        db.close()
+
+    response = client.get(f"/files/{file_id}", headers={**auth_headers, "If-None-Match": '"abc"'})
+    assert response.status_code == 200
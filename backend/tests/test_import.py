@@ -0,0 +1,33 @@
+import json
+
+# =========================================================
+# BULK IMPORT
+# =========================================================
+
+
+def test_import_chunk_is_one_batched_insert(client, auth_headers, capture_statements):
+    # Mixed NULL columns (completed_at, due_date, description) must not
+    # split the chunk into per-row statements
+    rows = [
+        {
+            "title": f"Imported {i}",
+            "status": "done" if i % 2 else "todo",
+            "priority": "low",
+            **({"due_date": "2030-01-01", "description": "x"} if i % 3 == 0 else {}),
+        }
+        for i in range(50)
+    ]
+    body = "\n".join(json.dumps(row) for row in rows) + "\n"
+
+    with capture_statements() as log:
+        response = client.post(
+            "/tasks/import",
+            params={"format": "ndjson"},
+            content=body,
+            headers=auth_headers,
+        )
+
+    assert response.status_code == 200
+    assert response.json()["inserted"] == 50
+    inserts = [s for s in log.statements if s.lstrip().upper().startswith("INSERT INTO TASKS ")]
+    assert len(inserts) == 1, len(inserts)
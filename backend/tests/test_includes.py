@@ -0,0 +1,52 @@
+import pytest
+
+# =========================================================
+# INCLUDE= STATEMENT COUNTS
+# =========================================================
+# Related data is loaded with one batched query per include option, so the
+# number of SQL statements behind GET /tasks must not grow with the page
+# size (no N+1 per task).
+
+PAGE_SIZES = (5, 30)
+
+
+def count_statements(client, auth_headers, capture_statements, params):
+    with capture_statements() as log:
+        response = client.get("/tasks/", params=params, headers=auth_headers)
+    assert response.status_code == 200
+    return response, len(log)
+
+
+@pytest.mark.parametrize("include", [None, "counts,latest_comment,assignee"])
+def test_list_statement_count_independent_of_page_size(client, auth_headers, capture_statements, include):
+    # Warm up: the first request of a token also loads the user
+    client.get("/tasks/", params={"limit": 1}, headers=auth_headers)
+
+    counts = {}
+    for limit in PAGE_SIZES:
+        params = {"limit": limit}
+        if include:
+            params["include"] = include
+        response, counts[limit] = count_statements(client, auth_headers, capture_statements, params)
+        assert len(response.json()) == limit
+
+    assert counts[PAGE_SIZES[0]] == counts[PAGE_SIZES[1]], counts
+
+
+def test_include_embeds_related_data(client, auth_headers):
+    response = client.get(
+        "/tasks/",
+        params={"limit": 5, "include": "counts,latest_comment,assignee"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    for task in response.json():
+        assert "comment_count" in task
+        assert "file_count" in task
+        assert "latest_comment" in task
+        assert "assignee_name" in task
+
+
+def test_include_rejects_unknown_option(client, auth_headers):
+    response = client.get("/tasks/", params={"include": "owner"}, headers=auth_headers)
+    assert response.status_code == 400
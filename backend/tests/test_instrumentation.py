@@ -0,0 +1,18 @@
+from sqlalchemy import text
+
+from app.database import engine
+
+# =========================================================
+# SQL INSTRUMENTATION
+# =========================================================
+
+
+def test_failed_statements_do_not_leak_start_times(client):
+    with engine.connect() as conn:
+        for _ in range(5):
+            try:
+                conn.execute(text("SELECT * FROM no_such_table"))
+            except Exception:
+                conn.rollback()
+        assert conn.info.get("query_started", []) == []
+
@@ -0,0 +1,75 @@
+import pytest
+
+from app.tasks import SORTABLE_FIELDS
+
+# =========================================================
+# QUERY PLANS
+# =========================================================
+# The list, export and analytics queries must be served by the partial
+# "live task" indexes (models.live_task_index): no full scan of tasks and
+# no temp B-tree sort, whatever the sort order or pagination mode.
+#
+# sort_by=relevance is not covered: ordering by bm25 rank always sorts.
+
+ORDERS = ("asc", "desc")
+
+
+def assert_indexed(log):
+    assert log.plans, "no SELECT statements were captured"
+    problems = log.plan_problems()
+    assert not problems, "unindexed task queries:\n" + "\n".join(problems)
+
+
+@pytest.mark.parametrize("order", ORDERS)
+@pytest.mark.parametrize("sort_by", sorted(SORTABLE_FIELDS))
+def test_list_offset_pages_use_indexes(client, auth_headers, capture_statements, sort_by, order):
+    with capture_statements(explain=True) as log:
+        response = client.get(
+            "/tasks/",
+            params={"sort_by": sort_by, "order": order, "page": 3, "limit": 20},
+            headers=auth_headers,
+        )
+    assert response.status_code == 200
+    assert_indexed(log)
+
+
+@pytest.mark.parametrize("order", ORDERS)
+@pytest.mark.parametrize("sort_by", sorted(SORTABLE_FIELDS))
+def test_list_cursor_pages_use_indexes(client, auth_headers, capture_statements, sort_by, order):
+    params = {"sort_by": sort_by, "order": order, "limit": 20}
+    first = client.get("/tasks/", params=params, headers=auth_headers)
+    assert first.status_code == 200
+    cursor = first.headers["X-Next-Cursor"]
+
+    with capture_statements(explain=True) as log:
+        response = client.get("/tasks/", params={**params, "cursor": cursor}, headers=auth_headers)
+    assert response.status_code == 200
+    assert_indexed(log)
+
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"status": "done"},
+    {"priority": "high"},
+    {"search": "cache"},
+])
+def test_export_uses_indexes(client, auth_headers, capture_statements, params):
+    with capture_statements(explain=True) as log:
+        response = client.get("/tasks/export", params={"format": "ndjson", **params}, headers=auth_headers)
+        assert response.status_code == 200
+    assert_indexed(log)
+
+
+@pytest.mark.parametrize("path", [
+    "/analytics/overview",
+    "/analytics/trends",
+    "/analytics/completion-trends",
+    "/analytics/cycle-time",
+])
+def test_analytics_use_indexes(client, auth_headers, capture_statements, path):
+    with capture_statements(explain=True) as log:
+        response = client.get(path, headers=auth_headers)
+    assert response.status_code == 200
+    # Endpoints served purely from the stats tables never touch tasks
+    problems = log.plan_problems()
+    assert not problems, "unindexed task queries:\n" + "\n".join(problems)
@@ -0,0 +1,110 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import fakeredis
+import pytest
+import redis
+
+from app import analytics_cache as cache_module
+from app.analytics_cache import AnalyticsCache, RedisBackend
+
+# =========================================================
+# REDIS ANALYTICS BACKEND (against fakeredis)
+# =========================================================
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        redis.Redis,
+        "from_url",
+        classmethod(lambda cls, url, **kwargs: fakeredis.FakeRedis(server=server)),
+    )
+    # Keep waiting callers snappy
+    monkeypatch.setattr(cache_module, "SINGLE_FLIGHT_TIMEOUT_SECONDS", 2)
+    monkeypatch.setattr(cache_module, "SINGLE_FLIGHT_POLL_SECONDS", 0.01)
+    return RedisBackend("redis://stand-in/0")
+
+
+def test_values_round_trip_as_json(backend):
+    backend.set("k", {"count": 3, "items": [1, 2]}, ttl=60)
+    assert backend.get("k") == {"count": 3, "items": [1, 2]}
+    assert backend.get("missing") is None
+    assert backend.client.get("analytics:k") is not None
+
+
+def test_values_expire_after_ttl(backend):
+    backend.set("k", [1], ttl=0.1)
+    assert backend.get("k") == [1]
+    time.sleep(0.2)
+    assert backend.get("k") is None
+
+
+def test_single_flight_holder_and_waiter(backend):
+    holding = threading.Event()
+    results = {}
+
+    def holder():
+        with backend.single_flight("k") as waited:
+            results["holder"] = waited
+            holding.set()
+            time.sleep(0.2)
+            backend.set("k", "value", ttl=60)
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    holding.wait()
+
+    started = time.monotonic()
+    with backend.single_flight("k") as waited:
+        # Polled until the holder stored the value
+        results["waiter"] = waited
+        results["value"] = backend.get("k")
+    thread.join()
+
+    assert results == {"holder": False, "waiter": True, "value": "value"}
+    assert time.monotonic() - started < 1
+    # The lock is released
+    assert not backend.client.exists("analytics:lock:k")
+
+
+def test_waiter_stops_polling_when_holder_gives_up(backend):
+    holding = threading.Event()
+
+    def holder():
+        with backend.single_flight("k"):
+            holding.set()
+            time.sleep(0.1)
+            # Fails without storing a value
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    holding.wait()
+
+    started = time.monotonic()
+    with backend.single_flight("k") as waited:
+        assert waited
+        assert backend.get("k") is None
+    thread.join()
+    assert time.monotonic() - started < 1
+
+
+def test_concurrent_misses_compute_once(backend):
+    cache = AnalyticsCache(backend, 60)
+    computed = []
+
+    def compute():
+        computed.append(1)
+        time.sleep(0.1)
+        return {"total": 1}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(
+            lambda _: cache.get_or_compute(1, 0, "summary", {}, compute), range(8)
+        ))
+
+    assert results == [{"total": 1}] * 8
+    assert len(computed) == 1
+    assert cache.stats()["misses"] == 1
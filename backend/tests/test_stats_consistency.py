@@ -0,0 +1,100 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app.database import SessionLocal
+from app.stats import check_stats
+from app.tasks import MAX_BULK_IDS
+
+# =========================================================
+# STATS CONSISTENCY UNDER CONCURRENT WRITES
+# =========================================================
+# Writes adjust the stats tables by the difference between a task's
+# contribution before and after the change; concurrent writers to the same
+# task must not both compute it from the same stale row.
+
+WORKERS = 8
+
+
+def assert_stats_in_sync():
+    db = SessionLocal()
+    try:
+        assert check_stats(db) == []
+    finally:
+        db.close()
+
+
+def create_task(client, auth_headers):
+    response = client.post(
+        "/tasks/",
+        json={"title": "Concurrent", "status": "todo", "priority": "low"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def run_concurrently(calls):
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        return [future.result() for future in [pool.submit(call) for call in calls]]
+
+
+def test_concurrent_updates_keep_stats_in_sync(client, auth_headers):
+    task_id = create_task(client, auth_headers)
+    statuses = ["in_progress", "done", "todo"] * 8
+
+    responses = run_concurrently(
+        lambda task_status=task_status: client.put(
+            f"/tasks/{task_id}",
+            json={"status": task_status, "priority": "high"},
+            headers=auth_headers,
+        )
+        for task_status in statuses
+    )
+
+    assert all(response.status_code == 200 for response in responses)
+    assert_stats_in_sync()
+
+
+def test_concurrent_deletes_count_once(client, auth_headers):
+    task_id = create_task(client, auth_headers)
+
+    responses = run_concurrently(
+        lambda: client.delete(f"/tasks/{task_id}", headers=auth_headers)
+        for _ in range(WORKERS)
+    )
+
+    assert sorted(response.status_code for response in responses) == [200] + [404] * (WORKERS - 1)
+    assert_stats_in_sync()
+
+
+def test_concurrent_bulk_writes_keep_stats_in_sync(client, auth_headers):
+    task_ids = [create_task(client, auth_headers) for _ in range(10)]
+
+    def bulk_update(task_status):
+        return client.request(
+            "PATCH",
+            "/tasks/bulk",
+            json={"ids": task_ids, "changes": {"status": task_status}},
+            headers=auth_headers,
+        )
+
+    def bulk_delete():
+        return client.request("DELETE", "/tasks/bulk", json={"ids": task_ids[:5]}, headers=auth_headers)
+
+    calls = [lambda task_status=task_status: bulk_update(task_status) for task_status in ["done", "todo"] * 6]
+    calls += [bulk_delete] * 4
+
+    responses = run_concurrently(calls)
+
+    assert all(response.status_code == 200 for response in responses)
+    assert sum(response.json().get("deleted", 0) for response in responses) == 5
+    assert_stats_in_sync()
+
+
+def test_bulk_selection_rejects_too_many_ids(client, auth_headers):
+    response = client.request(
+        "DELETE",
+        "/tasks/bulk",
+        json={"ids": list(range(1, MAX_BULK_IDS + 2))},
+        headers=auth_headers,
+    )
+    assert response.status_code == 422
@@ -0,0 +1,76 @@
+import asyncio
+import io
+import os
+import signal
+import time
+
+import pytest
+from PIL import Image
+
+from app import thumbnails
+from app.database import SessionLocal
+from app.models import File
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "photo.png"
+    Image.new("RGB", (640, 480), "red").save(path)
+    return str(path)
+
+
+def kill_worker():
+    """Kills one pool worker, as the OOM killer would, and waits for the pool to notice."""
+    pool = thumbnails._executor
+    # Make sure the workers are up
+    pool.submit(os.getpid).result(timeout=60)
+    os.kill(next(iter(pool._processes)), signal.SIGKILL)
+
+    deadline = time.monotonic() + 30
+    while not pool._broken and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert pool._broken
+
+
+def test_pool_recovers_after_worker_dies(image):
+    assert asyncio.run(thumbnails.ensure_thumbnail(image, "image/png"))
+    os.remove(thumbnails.thumbnail_path(image))
+
+    kill_worker()
+
+    # Best effort after an upload's commit: must not raise
+    thumbnails.schedule_thumbnail(image, "image/png")
+
+    path = asyncio.run(thumbnails.ensure_thumbnail(image, "image/png"))
+    assert path == thumbnails.thumbnail_path(image)
+    with Image.open(path) as thumbnail:
+        assert max(thumbnail.size) <= thumbnails.THUMBNAIL_SIZE
+
+
+def test_thumbnail_for_file_without_content_type(client, auth_headers):
+    task = client.post("/tasks/", json={"title": "With attachment"}, headers=auth_headers).json()
+    buffer = io.BytesIO()
+    Image.new("RGB", (320, 200), "blue").save(buffer, "PNG")
+    response = client.post(
+        f"/files/task/{task['id']}",
+        files={"upload": ("legacy.png", buffer.getvalue(), "image/png")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    file_id = response.json()["id"]
+
+    # As stored before content types were recorded, thumbnail not generated yet
+    db = SessionLocal()
+    try:
+        file = db.get(File, file_id)
+        file.content_type = None
+        db.commit()
+        path = file.path
+    finally:
+        db.close()
+    if os.path.exists(thumbnails.thumbnail_path(path)):
+        os.remove(thumbnails.thumbnail_path(path))
+
+    response = client.get(f"/files/{file_id}/thumbnail", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == thumbnails.THUMBNAIL_MEDIA_TYPE
@@ -0,0 +1,45 @@
+import time
+
+import pytest
+
+from app.analytics import MAX_TREND_BUCKETS
+
+# =========================================================
+# TREND RANGES
+# =========================================================
+
+
+@pytest.mark.parametrize("params, buckets", [
+    ({"from": "9999-12-01", "to": "9999-12-31", "granularity": "day"}, 31),
+    ({"from": "9999-12-01", "to": "9999-12-31", "granularity": "week"}, 5),
+    ({"to": "9999-12-31", "granularity": "month"}, 12),
+    ({"from": "9999-12-01", "to": "9999-12-31", "tz_offset": -120}, 31),
+    ({"from": "0001-01-01", "to": "0001-01-31", "tz_offset": 120}, 31),
+    ({"from": "2024-01-01", "to": "2024-12-31", "granularity": "month"}, 12),
+    ({"from": "2024-01-03", "to": "2024-01-08", "granularity": "week"}, 2),
+])
+def test_ranges_at_date_limits(client, auth_headers, params, buckets):
+    response = client.get("/analytics/completion-trends", params=params, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == buckets
+
+
+@pytest.mark.parametrize("params", [
+    {"to": "0001-01-05", "granularity": "day"},
+    {"to": "0001-03-31", "granularity": "month"},
+])
+def test_default_range_before_first_date_is_rejected(client, auth_headers, params):
+    response = client.get("/analytics/trends", params=params, headers=auth_headers)
+    assert response.status_code == 400
+
+
+def test_huge_range_is_rejected_without_building_it(client, auth_headers):
+    started = time.perf_counter()
+    response = client.get(
+        "/analytics/trends",
+        params={"from": "0001-01-01", "to": "9999-12-31"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 400
+    assert str(MAX_TREND_BUCKETS) in response.json()["detail"]
+    assert time.perf_counter() - started < 1
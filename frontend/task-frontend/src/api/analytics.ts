@@ -20,6 +20,12 @@ export type UserPerformance = {
   completion_rate: number; 
 };
 
+/* Overview + performance in one response */
+export type AnalyticsSummary = OverviewResponse &
+  UserPerformance & {
+    overdue_tasks: number;
+  };
+
 /* Completion trends */
 export type CompletionTrendPoint = {
   date: string;      
@@ -27,6 +33,28 @@ export type CompletionTrendPoint = {
   completed: number;   
 };
 
+/* Trend range (dates are YYYY-MM-DD in the browser's timezone) */
+export type TrendGranularity = "day" | "week" | "month";
+
+export type TrendParams = {
+  from?: string;
+  to?: string;
+  granularity?: TrendGranularity;
+};
+
+function trendQuery(params?: TrendParams) {
+  const query = new URLSearchParams();
+
+  if (params?.from) query.append("from", params.from);
+  if (params?.to) query.append("to", params.to);
+  if (params?.granularity) query.append("granularity", params.granularity);
+
+  // getTimezoneOffset() is UTC - local; the API expects local - UTC
+  query.append("tz_offset", String(-new Date().getTimezoneOffset()));
+
+  return query.toString();
+}
+
 /* =======================
    API calls
 ======================= */
@@ -35,8 +63,14 @@ export function getOverview() {
   return apiFetch("/analytics/overview") as Promise<OverviewResponse>;
 }
 
-export function getTrends() {
-  return apiFetch("/analytics/trends") as Promise<TrendPoint[]>;
+export function getSummary() {
+  return apiFetch("/analytics/summary") as Promise<AnalyticsSummary>;
+}
+
+export function getTrends(params?: TrendParams) {
+  return apiFetch(
+    `/analytics/trends?${trendQuery(params)}`
+  ) as Promise<TrendPoint[]>;
 }
 
 export function getUserPerformance() {
@@ -46,8 +80,8 @@ export function getUserPerformance() {
 }
 
 /* Created vs Completed trend */
-export function getCompletionTrends() {
+export function getCompletionTrends(params?: TrendParams) {
   return apiFetch(
-    "/analytics/completion-trends"
+    `/analytics/completion-trends?${trendQuery(params)}`
   ) as Promise<CompletionTrendPoint[]>;
 }
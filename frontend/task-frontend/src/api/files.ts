@@ -5,6 +5,9 @@ export type FileItem = {
   filename: string;
   path: string;
   task_id: number;
+  size: number | null;
+  content_type: string | null;
+  sha256: string | null;
 };
 
 /* =======================
@@ -34,6 +37,47 @@ export async function uploadFile(taskId: number, file: File) {
   return (await res.json()) as FileItem;
 }
 
+/* =======================
+   UPLOAD MANY FILES (one request)
+======================= */
+export type BatchUploadResult = {
+  filename: string;
+  file: FileItem | null;
+  error: string | null;
+};
+
+export type BatchUpload = {
+  uploaded: number;
+  failed: number;
+  results: BatchUploadResult[];
+};
+
+export async function uploadFiles(taskId: number, files: File[]) {
+  const form = new FormData();
+
+  for (const file of files) {
+    form.append("uploads", file);
+  }
+
+  const res = await fetch(
+    `http://127.0.0.1:8000/files/task/${taskId}/batch`,
+    {
+      method: "POST",
+      headers: {
+        Authorization: `Bearer ${localStorage.getItem("token") ?? ""}`,
+      },
+      body: form,
+    }
+  );
+
+  if (!res.ok) {
+    const text = await res.text();
+    throw new Error(text || "Failed to upload files");
+  }
+
+  return (await res.json()) as BatchUpload;
+}
+
 /* =======================
    LIST FILES FOR TASK
 ======================= */
@@ -48,6 +92,27 @@ export function getFile(fileId: number) {
   return apiFetch(`/files/${fileId}`) as Promise<FileItem>;
 }
 
+/* =======================
+   FILE THUMBNAIL
+   (object URL for <img>; revoke it when done)
+======================= */
+export async function getThumbnailUrl(fileId: number) {
+  const res = await fetch(
+    `http://127.0.0.1:8000/files/${fileId}/thumbnail`,
+    {
+      headers: {
+        Authorization: `Bearer ${localStorage.getItem("token") ?? ""}`,
+      },
+    }
+  );
+
+  if (!res.ok) {
+    return null;
+  }
+
+  return URL.createObjectURL(await res.blob());
+}
+
 /* =======================
    DELETE FILE
 ======================= */
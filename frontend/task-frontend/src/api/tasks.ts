@@ -1,4 +1,5 @@
 import { apiFetch } from "./client";
+import type { Comment } from "./comments";
 
 /* =======================
    Types
@@ -30,6 +31,16 @@ export type Task = {
   due_date?: string;
 };
 
+export type TaskInclude = "counts" | "latest_comment" | "assignee";
+
+/* Task with the related data requested via `include` */
+export type TaskDetail = Task & {
+  comment_count?: number;
+  file_count?: number;
+  latest_comment?: Comment | null;
+  assignee_name?: string | null;
+};
+
 export type TaskInput = {
   title: string;
   description?: string;
@@ -38,7 +49,7 @@ export type TaskInput = {
   due_date?: string;
 };
 
-export type ExportFormat = "csv" | "json";
+export type ExportFormat = "csv" | "json" | "ndjson";
 
 /* =======================
    API calls
@@ -50,6 +61,7 @@ export const getTasks = (params?: {
   search?: string;
   sort_by?: TaskSortBy;
   order?: SortOrder;
+  include?: TaskInclude[];
 } & PaginationParams) => {
   const query = new URLSearchParams();
 
@@ -58,15 +70,18 @@ export const getTasks = (params?: {
   if (params?.search) query.append("search", params.search);
   if (params?.sort_by) query.append("sort_by", params.sort_by);
   if (params?.order) query.append("order", params.order);
+  if (params?.include?.length) query.append("include", params.include.join(","));
 
   query.append("page", String(params?.page ?? 1));
   query.append("limit", String(params?.limit ?? 10));
 
-  return apiFetch(`/tasks?${query.toString()}`) as Promise<Task[]>;
+  return apiFetch(`/tasks?${query.toString()}`) as Promise<TaskDetail[]>;
 };
 
-export const getTask = (id: number) =>
-  apiFetch(`/tasks/${id}`) as Promise<Task>;
+export const getTask = (id: number, include?: TaskInclude[]) =>
+  apiFetch(
+    include?.length ? `/tasks/${id}?include=${include.join(",")}` : `/tasks/${id}`
+  ) as Promise<TaskDetail>;
 
 export const createTask = (data: TaskInput) =>
   apiFetch("/tasks", {
@@ -95,6 +110,35 @@ export const bulkCreateTasks = (tasks: TaskInput[]) =>
     body: JSON.stringify({ tasks }),
   }) as Promise<Task[]>;
 
+/* =======================
+   BULK UPDATE / DELETE
+======================= */
+
+export type BulkSelection =
+  | { ids: number[] }
+  | {
+      filter: {
+        status?: TaskStatus;
+        priority?: TaskPriority;
+        search?: string;
+      };
+    };
+
+export const bulkUpdateTasks = (
+  selection: BulkSelection,
+  changes: Partial<TaskInput>
+) =>
+  apiFetch("/tasks/bulk", {
+    method: "PATCH",
+    body: JSON.stringify({ ...selection, changes }),
+  }) as Promise<{ updated: number }>;
+
+export const bulkDeleteTasks = (selection: BulkSelection) =>
+  apiFetch("/tasks/bulk", {
+    method: "DELETE",
+    body: JSON.stringify(selection),
+  }) as Promise<{ deleted: number }>;
+
 /* =======================
    EXPORT TASKS 
 ======================= */